@@ -0,0 +1,73 @@
+import time
+import timeit
+import sys, os
+from lxml import html
+from crawlEngine import CrawlEngine
+
+# Pages are cached with the document cache shared with assignment2
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assignment2'))
+from documentCache import DocumentCache
+from facultyWebScraping import facultySites, xpathAPU, xpathGCU, xpathWM
+
+'''
+Micro-benchmark of page parsing over the pages saved in the scraper's cache
+(run the scraper once first). For every cached page of each site it times:
+    before = a fresh parse with the default parser, and each of the site's
+             XPath expressions evaluated from its string
+    after  = a parse with the reused parser, and the precompiled XPaths
+Both sides evaluate the same expressions on the same pages, so only
+compiling and parser setup differ. The full parse callbacks are timed too.
+'''
+
+# Cache to read pages from, and the site roots the pages were fetched from
+cache_dir = 'cache/pages'
+roots = {}  # e.g. {'apuRoot': 'http://127.0.0.1:8000/apu'} for locally served copies
+repeat = 20
+
+cache = DocumentCache(cache_dir, offline=True)
+engine = CrawlEngine(cache=cache)
+sites = facultySites(**roots)
+specs = {'APU': xpathAPU, 'GCU': xpathGCU, 'WM': xpathWM}
+
+
+def before(text, expressions):
+    tree = html.fromstring(text)
+    for expression in expressions:
+        tree.xpath(expression.path)
+
+
+def after(text, expressions):
+    tree = html.fromstring(text, parser=engine.parser())
+    for expression in expressions:
+        expression(tree)
+
+
+def best_time(function, *args):
+    # Best of several runs, in milliseconds per call
+    timer = timeit.Timer(lambda: function(*args))
+    return min(timer.repeat(3, repeat)) / repeat * 1000
+
+
+print '%-6s %6s %12s %12s %12s' % ('site', 'pages', 'before (ms)', 'after (ms)', 'callback (ms)')
+for site in sites:
+    if site.directoryURL not in cache:
+        print '%-6s not cached' % site.name
+        continue
+    expressions = specs[site.name].values()
+    directoryTree = engine.fetch_tree(site.directoryURL)
+    profiles = [(url, context) for url, context in site.parse_directory(directoryTree, site.rootURL)
+                if url in cache]
+    pages = [engine.fetch_text(site.directoryURL)] + [engine.fetch_text(url) for url, context in profiles]
+
+    before_ms = sum(best_time(before, text, expressions) for text in pages) / len(pages)
+    after_ms = sum(best_time(after, text, expressions) for text in pages) / len(pages)
+
+    # Directory page plus every cached profile through the real callbacks
+    start = time.time()
+    for i in range(repeat):
+        site.parse_directory(html.fromstring(pages[0], parser=engine.parser()), site.rootURL)
+        for text, (url, context) in zip(pages[1:], profiles):
+            site.parse_profile(html.fromstring(text, parser=engine.parser()), context)
+    callback_ms = (time.time() - start) / repeat / len(pages) * 1000
+
+    print '%-6s %6d %12.3f %12.3f %12.3f' % (site.name, len(pages), before_ms, after_ms, callback_ms)
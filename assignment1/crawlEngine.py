@@ -0,0 +1,206 @@
+import os
+import sys
+import threading
+import time
+import urlparse
+from multiprocessing.pool import ThreadPool
+
+import requests
+from lxml import html
+
+# The page cache is the document cache shared with assignment2
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assignment2'))
+from documentCache import CacheMiss
+
+'''
+Shared crawl engine for the faculty scrapers.
+
+Each site is described by its directory page and two parse callbacks: one
+that turns the directory page into a list of profile URLs (each with some
+context from the directory, such as the professor's title), and one that
+turns a profile page into a record. All sites are crawled at the same
+time, each with its own pool of threads, so the total run time is bounded
+by the slowest host instead of the sum of all page latencies.
+
+Requests to a host are limited to per_host at once and spaced at least
+delay seconds apart. Each thread reuses its own keep-alive session and
+HTML parser, and failed requests are retried with exponential backoff.
+
+With a cache, pages are stored with their ETag / Last-Modified validators
+and revalidated with conditional GETs, so unchanged pages come back as an
+empty 304 and are read from disk. In replay mode (an offline cache) no
+requests are made at all, which makes it possible to rework the parse
+callbacks against the saved pages at local-disk speed.
+'''
+
+class Site(object):
+    '''A faculty directory to crawl
+    Takes a name, the root URL, the directory page URL and the two callbacks:
+    parse_directory(directoryTree, rootURL) -> list of (profile URL, context)
+    parse_profile(facultyTree, context) -> record, or None to skip it'''
+
+    def __init__(self, name, rootURL, directoryURL, parse_directory, parse_profile):
+        self.name = name
+        self.rootURL = rootURL
+        self.directoryURL = directoryURL
+        self.parse_directory = parse_directory
+        self.parse_profile = parse_profile
+
+
+class CrawlEngine(object):
+    '''Fetches and parses pages for several sites concurrently
+    Takes the number of concurrent requests per host, the minimum delay
+    between requests to one host (seconds), the request timeout (seconds),
+    the number of retries, the base backoff delay (seconds) and optionally
+    a DocumentCache for the pages'''
+
+    def __init__(self, per_host=4, delay=0.25, timeout=10, retries=3, backoff=0.5, cache=None):
+        self.per_host = per_host
+        self.delay = delay
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        self._next_request = {}
+
+    def session(self):
+        '''Returns the keep-alive session owned by the calling thread'''
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def parser(self):
+        '''Returns the HTML parser owned by the calling thread
+        lxml parsers can't be used by two threads at once, so each thread
+        keeps one and reuses it for every page it parses'''
+        parser = getattr(self._local, 'parser', None)
+        if parser is None:
+            parser = self._local.parser = html.HTMLParser()
+        return parser
+
+    def _wait_turn(self, host):
+        '''Reserves the next request slot for a host and waits for it
+        Returns the semaphore limiting concurrent requests to the host'''
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            now = time.time()
+            start = max(now, self._next_request.get(host, 0))
+            self._next_request[host] = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+        return self._host_slots[host]
+
+    def get(self, url, headers=None):
+        '''Fetches a page politely, retrying connection and server errors
+        Takes the URL (string) and optionally extra request headers
+        Returns the response'''
+        host = urlparse.urlparse(url).netloc
+        for attempt in range(self.retries + 1):
+            with self._wait_turn(host):
+                try:
+                    response = self.session().get(url, headers=headers, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt == self.retries:
+                        raise
+                else:
+                    # Only server errors are worth retrying
+                    if response.status_code < 500 or attempt == self.retries:
+                        response.raise_for_status()
+                        return response
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def _cached_text(self, url):
+        '''Returns the cached page decoded as it was when downloaded'''
+        encoding = self.cache.entry(url).get('encoding')
+        content = self.cache.read(url)
+        return content.decode(encoding, 'replace') if encoding else content
+
+    def fetch_text(self, url):
+        '''Takes a URL (string)
+        Returns the page contents, from the cache when it is still current
+        Raises CacheMiss in replay mode if the page was never cached'''
+        if self.cache is None:
+            return self.get(url).text
+        if self.cache.offline:
+            return self._cached_text(url)
+
+        response = self.get(url, self.cache.validators(url))
+        if response.status_code == 304:
+            return self._cached_text(url)
+        self.cache.store(url, response)
+        return response.text
+
+    def fetch_tree(self, url):
+        '''Takes a URL (string)
+        Returns the parsed HTML tree of the page'''
+        return html.fromstring(self.fetch_text(url), parser=self.parser())
+
+    def crawl_site(self, site, output=None):
+        '''Crawls one site
+        Takes a Site and optionally an output to stream records to
+        Returns its records in directory order, or with an output the
+        number of records written'''
+        try:
+            profiles = site.parse_directory(self.fetch_tree(site.directoryURL), site.rootURL)
+        except Exception as error:
+            # One unreachable or unparsable directory doesn't stop the other sites
+            print 'Skipping %s: %s' % (site.name, describe(error))
+            return [] if output is None else 0
+        if output is not None:
+            # Profiles completed by an earlier run aren't fetched again
+            profiles = [profile for profile in profiles if not output.done(profile[0])]
+
+        def crawl_profile(profile):
+            url, context = profile
+            try:
+                record = site.parse_profile(self.fetch_tree(url), context)
+            except Exception as error:
+                # Download errors, pages missing from the cache and pages the
+                # callback can't parse are all skipped. They aren't
+                # checkpointed, so a resumed run tries them again
+                print 'Skipping %s: %s' % (url, describe(error))
+                return None
+            if output is None:
+                return record
+            output.write(url, record)
+            return record is not None
+
+        pool = ThreadPool(self.per_host)
+        try:
+            records = pool.map(crawl_profile, profiles)
+        finally:
+            pool.terminate()
+        if output is not None:
+            return sum(1 for written in records if written)
+        return [record for record in records if record is not None]
+
+    def crawl(self, sites, output=None):
+        '''Crawls all sites at the same time
+        Takes a list of Sites and optionally an output (e.g. a RecordWriter)
+        with done(url) and write(url, record) methods
+        Returns the records of all sites, site by site in the given order.
+        With an output, records are written as each profile is parsed, not
+        collected, and the number of records written is returned'''
+        pool = ThreadPool(len(sites))
+        try:
+            results = pool.map(lambda site: self.crawl_site(site, output), sites)
+        finally:
+            pool.terminate()
+            if self.cache is not None:
+                self.cache.save()
+        if output is not None:
+            return sum(results)
+        return [record for records in results for record in records]
+
+
+def describe(error):
+    '''Formats an exception for a skip message, naming the type of errors
+    other than failed requests (e.g. AttributeError from a parse callback)'''
+    if isinstance(error, (requests.RequestException, CacheMiss)):
+        return str(error)
+    return '%s: %s' % (type(error).__name__, error)
@@ -0,0 +1,108 @@
+import csv
+import os
+import sqlite3
+from itertools import islice
+
+'''
+SQLite copy of the scraped faculty data, in the mikekelly table layout of
+mikekelly.sql.gz.
+
+Records are inserted in batches with executemany, one transaction per
+batch, instead of one statement and commit per row. A professor is
+identified by first name, last name and current university, so loading a
+newer scrape updates the rows of professors already in the table in
+place, keeping their ids, instead of duplicating them.
+'''
+
+COLUMNS = ['firstname', 'lastname', 'grad_school', 'grad_school_code', 'highest_degree', 'grad_year',
+           'university', 'university_code', 'title', 'department']
+
+INTEGER_COLUMNS = set(['grad_school_code', 'grad_year', 'university_code'])
+
+# Columns identifying a professor, as in the mikekelly_professor index
+KEY_COLUMNS = ['firstname', 'lastname', 'university']
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS mikekelly (
+    id INTEGER PRIMARY KEY,
+    firstname VARCHAR(100),
+    lastname VARCHAR(100),
+    grad_school VARCHAR(200),
+    grad_school_code SMALLINT,
+    highest_degree VARCHAR(20),
+    grad_year SMALLINT,
+    university VARCHAR(200),
+    university_code SMALLINT,
+    grad_school_department VARCHAR(200),
+    title VARCHAR(100),
+    department VARCHAR(200)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS mikekelly_professor ON mikekelly (firstname, lastname, university);
+CREATE INDEX IF NOT EXISTS mikekelly_grad_school_code ON mikekelly (grad_school_code);
+CREATE INDEX IF NOT EXISTS mikekelly_university_code ON mikekelly (university_code);
+'''
+
+
+class FacultyDatabase(object):
+    '''SQLite database of faculty records
+    Takes the path of the database file'''
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.db = sqlite3.connect(path)
+        self.db.text_factory = str
+        self.db.executescript(SCHEMA)
+
+    def load(self, records, batch_size=5000):
+        '''Inserts or updates records, batch_size rows per transaction
+        Takes an iterable of records with the scraper's columns (lists)
+        Returns the number of records loaded'''
+        # Existing professors are updated first and the rest inserted, so
+        # rows keep their id (INSERT OR REPLACE would delete and re-insert)
+        value_columns = [column for column in COLUMNS if column not in KEY_COLUMNS]
+        update = 'UPDATE mikekelly SET %s WHERE %s' % (
+            ', '.join(column + ' = ?' for column in value_columns),
+            ' AND '.join(column + ' = ?' for column in KEY_COLUMNS))
+        insert = 'INSERT OR IGNORE INTO mikekelly (%s) VALUES (%s)' % (
+            ', '.join(COLUMNS), ', '.join(['?'] * len(COLUMNS)))
+        positions = [COLUMNS.index(column) for column in value_columns + KEY_COLUMNS]
+        records = iter(records)
+        loaded = 0
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return loaded
+            with self.db:
+                self.db.executemany(update, ([record[i] for i in positions] for record in batch))
+                self.db.executemany(insert, batch)
+            loaded += len(batch)
+
+    def load_csv(self, path, batch_size=5000):
+        '''Loads a CSV file written by the scraper
+        Takes the path of the CSV file
+        Returns the number of records loaded'''
+        with open(path, 'rb') as csv_file:
+            return self.load((csv_record(row) for row in csv.DictReader(csv_file)), batch_size)
+
+    def count(self):
+        return self.db.execute('SELECT COUNT(*) FROM mikekelly').fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+def csv_record(row):
+    '''Converts a CSV row (dict of strings) to a record, with empty values as
+    NULL and the code and year columns as integers'''
+    record = []
+    for column in COLUMNS:
+        value = row.get(column) or None
+        if value is not None and column in INTEGER_COLUMNS:
+            try:
+                value = int(float(value))
+            except ValueError:
+                pass
+        record.append(value)
+    return record
@@ -0,0 +1,132 @@
+import math
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+'''
+Approximate lookup of school names, for education lines that don't contain
+any school name from schools.csv verbatim.
+
+Names are normalized (lower case, no punctuation, common abbreviations such
+as "Univ." expanded) and broken into character trigrams. An inverted index
+maps each trigram to the names containing it, and candidates are scored
+with the Dice coefficient of the two trigram sets. The query's trigrams
+are looked up rarest first. Postings are sorted by the size of each name's
+trigram set, and a name whose first shared trigram comes late in that
+order can't share many, so it must be short to beat the best match so far:
+each posting list is only read over the sizes that still can, found with a
+binary search. For common trigrams like "uni" that range is narrow or
+empty, so lookups stay fast with tens of thousands of names.
+'''
+
+ABBREVIATIONS = {'univ': 'university',
+                 'u': 'university',
+                 'coll': 'college',
+                 'inst': 'institute',
+                 'sch': 'school',
+                 'sem': 'seminary',
+                 'theol': 'theological',
+                 'natl': 'national',
+                 'intl': 'international'}
+
+regexp_word = re.compile(r'[a-z0-9]+')
+
+
+def normalize(name):
+    '''Takes a school name (string)
+    Returns it in lower case, without punctuation and with abbreviations expanded'''
+    words = regexp_word.findall(name.lower().replace('&', ' and '))
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in words)
+
+
+def trigrams(name):
+    '''Takes a normalized name
+    Returns the set of its character trigrams, padded at both ends'''
+    padded = ' ' + name + ' '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class FuzzySchoolIndex(object):
+    '''Trigram index over school names
+    Takes a list of school dicts with 'id' and 'name' keys and the minimum
+    Dice similarity (0 to 1) for a match'''
+
+    def __init__(self, schools, threshold=0.85):
+        self.schools = schools
+        self.threshold = threshold
+
+        # Each school is indexed under its full name and under the part
+        # before the first comma, since the city is often left out
+        self._names = []
+        self._grams = []
+        self._postings = defaultdict(list)
+        for index, school in enumerate(schools):
+            variants = set([normalize(school['name']), normalize(school['name'].split(',', 1)[0])])
+            for name in variants:
+                if not name:
+                    continue
+                entry = len(self._names)
+                self._names.append(index)
+                self._grams.append(trigrams(name))
+                for gram in self._grams[entry]:
+                    self._postings[gram].append(entry)
+
+        # Sort each posting list by trigram count, kept alongside for bisecting
+        self._sizes = {}
+        for gram, entries in self._postings.iteritems():
+            entries.sort(key=lambda entry: len(self._grams[entry]))
+            self._sizes[gram] = [len(self._grams[entry]) for entry in entries]
+
+    def lookup(self, text):
+        '''Takes a piece of text naming a school
+        Returns a tuple of the most similar school dict and its score, or
+        None if no school reaches the threshold'''
+
+        query = trigrams(normalize(text))
+        if len(query) < 2:
+            return None
+
+        # A name of size n scores at least best_score if it shares at least
+        # best_score * (len(query) + n) / 2 trigrams with the query. If the
+        # first query trigram it contains, rarest first, is the i-th, it
+        # shares at most len(query) - i, so it can only be that long. The
+        # range of sizes worth reading shrinks with every trigram and with
+        # every better match, so the long posting lists of common trigrams
+        # like "uni" are read over a narrow range of sizes, or not at all
+        size = len(query)
+        rarest = sorted(query, key=lambda gram: len(self._postings.get(gram, ())))
+        best, best_score = None, self.threshold
+        seen = set()
+        all_grams = self._grams
+        for i, gram in enumerate(rarest):
+            min_size = int(math.ceil(best_score * size / (2 - best_score) - 1e-9))
+            max_size = int(math.floor(2 * (size - i) / best_score - size + 1e-9))
+            if max_size < min_size:
+                break
+            if gram not in self._postings:
+                continue
+            sizes = self._sizes[gram]
+            for entry in self._postings[gram][bisect_left(sizes, min_size):bisect_right(sizes, max_size)]:
+                if entry in seen:
+                    continue
+                seen.add(entry)
+                grams = all_grams[entry]
+                score = 2.0 * len(query & grams) / (size + len(grams))
+                if score > best_score or (score == best_score and best is None):
+                    best, best_score = entry, score
+
+        if best is None:
+            return None
+        return self.schools[self._names[best]], best_score
+
+    def resolve(self, text):
+        '''Looks up the whole text and each of its comma separated parts, since
+        education lines often mix the school with the degree, field or year
+        Takes a piece of text (string)
+        Returns the best (school dict, score) tuple, or None'''
+        best = None
+        for part in [text] + text.split(','):
+            match = self.lookup(part)
+            if match is not None and (best is None or match[1] > best[1]):
+                best = match
+        return best
@@ -0,0 +1,20 @@
+import time
+from facultyDatabase import FacultyDatabase
+
+'''
+This script loads scraped faculty CSV files into a SQLite database, in the
+mikekelly table layout. Professors already in the database (same first
+name, last name and university) are updated with the newer records.
+'''
+
+# Database file and CSV files to load into it
+database_path = 'faculty.db'
+csv_files = ['faculty.csv']
+
+database = FacultyDatabase(database_path)
+for csv_file in csv_files:
+    start = time.time()
+    loaded = database.load_csv(csv_file)
+    print 'Loaded %d records from %s in %.2f seconds' % (loaded, csv_file, time.time() - start)
+print '%d professors in %s' % (database.count(), database_path)
+database.close()
@@ -0,0 +1,85 @@
+import csv
+import os
+import threading
+
+'''
+Incremental output for the faculty scraper.
+
+Records are appended to a partial file next to the CSV file (<path>.partial)
+as soon as each profile is parsed, and the profile's URL is then appended
+to a checkpoint file. If a run stops part way, the next run finds the
+checkpoint, keeps the rows written so far and skips the profiles already
+completed. A run that gets to the end renames the partial file over the
+CSV file and removes the checkpoint, so the previous complete output stays
+in place until there is a new one, and the following run starts afresh.
+'''
+
+
+class RecordWriter(object):
+    '''Streams records to a CSV file with a checkpoint of completed URLs
+    Takes the CSV path, the column names and the checkpoint path'''
+
+    def __init__(self, path, columns, checkpoint_path):
+        self.path = path
+        self.partial_path = path + '.partial'
+        self.checkpoint_path = checkpoint_path
+        self._lock = threading.Lock()
+
+        self.completed = set()
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, 'r') as checkpoint_file:
+                self.completed.update(line.rstrip('\n') for line in checkpoint_file)
+        else:
+            directory = os.path.dirname(checkpoint_path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+
+        # Resume the partial file only when there is a checkpoint to go with it
+        resume = (bool(self.completed) and os.path.exists(self.partial_path)
+                  and os.path.getsize(self.partial_path) > 0)
+        if not resume:
+            self.completed.clear()
+        self._file = open(self.partial_path, 'ab' if resume else 'wb')
+        self._writer = csv.writer(self._file, lineterminator='\n')
+        if not resume:
+            self._writer.writerow(columns)
+            self._file.flush()
+        self._checkpoint = open(checkpoint_path, 'a' if resume else 'w')
+
+    def done(self, url):
+        '''Returns True if the profile at url was completed by an earlier run'''
+        return url in self.completed
+
+    def write(self, url, record):
+        '''Saves a parsed profile
+        Takes the profile URL and its record (list, or None if it was skipped)'''
+        with self._lock:
+            if record is not None:
+                self._writer.writerow([encode(value) for value in record])
+                self._file.flush()
+            # Mark the profile done only once its record is on disk
+            self._checkpoint.write(url + '\n')
+            self._checkpoint.flush()
+            self.completed.add(url)
+
+    def finish(self):
+        '''Closes the output after a complete run, moves it over the CSV file
+        and removes the checkpoint'''
+        self.close()
+        os.rename(self.partial_path, self.path)
+        os.remove(self.checkpoint_path)
+
+    def close(self):
+        '''Closes the output, keeping the partial file and the checkpoint to
+        resume from'''
+        self._file.close()
+        self._checkpoint.close()
+
+
+def encode(value):
+    '''Formats a record value for the CSV file (UTF-8, empty for None)'''
+    if value is None:
+        return ''
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
@@ -0,0 +1,44 @@
+import csv
+from fuzzySchoolIndex import FuzzySchoolIndex
+
+'''
+This script fills in missing grad_school_code values in an existing faculty
+CSV file. Grad schools the scraper couldn't find verbatim in schools.csv are
+looked up approximately, and rows whose school is similar enough to a known
+one get that school's name and code.
+'''
+
+# Files to read and write (the same file updates it in place)
+input_file = 'faculty.csv'
+output_file = 'faculty.csv'
+
+# Minimum similarity (0 to 1) for a school to be accepted
+threshold = 0.85
+
+# Load schools data for reference and matching
+schools = []
+for row in csv.DictReader(open('schools.csv')):
+    schools.append({'id':int(row['id']), 'name':row['name']})
+fuzzySchools = FuzzySchoolIndex(schools, threshold)
+
+with open(input_file, 'rb') as faculty_file:
+    reader = csv.DictReader(faculty_file)
+    fieldnames = reader.fieldnames
+    professors = list(reader)
+
+resolved = 0
+for professor in professors:
+    if professor['grad_school'] and not professor['grad_school_code']:
+        match = fuzzySchools.resolve(professor['grad_school'])
+        if match is not None:
+            school, score = match
+            print '%s -> %s (%.2f)' % (professor['grad_school'], school['name'], score)
+            professor['grad_school'] = school['name']
+            professor['grad_school_code'] = school['id']
+            resolved += 1
+
+with open(output_file, 'wb') as faculty_file:
+    writer = csv.DictWriter(faculty_file, fieldnames, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(professors)
+print 'Resolved %d grad schools, results saved in %s' % (resolved, output_file)
@@ -0,0 +1,68 @@
+from collections import deque
+
+'''
+Finds known school names in free text.
+
+Schools are matched on the part of their name before the first comma (the
+city or campus that follows it is rarely written out on faculty pages).
+All keys are compiled once into an Aho-Corasick automaton, so a piece of
+text is searched for every school in a single pass over its characters,
+however many schools there are. When several schools occur in the text the
+longest name wins, and among schools with the same key the last one in the
+file wins, as with the original scan over the list.
+'''
+
+
+class SchoolMatcher(object):
+    '''Aho-Corasick matcher over school names
+    Takes a list of school dicts with 'id' and 'name' keys'''
+
+    def __init__(self, schools):
+        self.schools = schools
+
+        # Trie of the match keys: one dict of character -> node per node
+        self._goto = [{}]
+        # Best school ending at each node, as (key length, school index)
+        self._best = [None]
+        for index, school in enumerate(schools):
+            key = school['name'].split(',', 1)[0]
+            if not key:
+                continue
+            node = 0
+            for char in key:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = self._goto[node][char] = len(self._goto)
+                    self._goto.append({})
+                    self._best.append(None)
+                node = next_node
+            self._best[node] = (len(key), index)
+
+        # Failure links, filled in breadth first so each node can also
+        # inherit the best match of its longest proper suffix
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].itervalues())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].iteritems():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[child] = fail
+                self._best[child] = max(self._best[child], self._best[fail])
+                queue.append(child)
+
+    def match(self, text):
+        '''Takes a piece of text (string)
+        Returns the best matching school dict, or None if no school occurs'''
+        goto, fail, best_at = self._goto, self._fail, self._best
+        best = None
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if best_at[node] > best:
+                best = best_at[node]
+        return self.schools[best[1]] if best is not None else None
@@ -0,0 +1,91 @@
+import struct
+import zipfile
+from array import array
+
+import numpy as np
+
+'''
+Columnar storage of ngram counts: one .npz file per run instead of one CSV
+per ngram order and document.
+
+The file holds four equal-length columns, doc_id, order, ngram and count,
+plus a dictionary array. The ngram column is an index into the dictionary,
+so each distinct ngram text is stored only once. Combined counts are stored
+with doc_id -1. The archive is written uncompressed, so load_counts() can
+memory-map every column straight from disk without parsing anything.
+'''
+
+COMBINED_DOC_ID = -1
+
+
+class ColumnarCountWriter(object):
+    '''Collects ngram counts and writes them as one columnar .npz file'''
+
+    def __init__(self):
+        # Typed arrays keep the columns compact while they grow
+        self.doc_ids = array('l')
+        self.orders = array('b')
+        self.ngrams = array('i')
+        self.counts = array('l')
+        self.ngram_ids = {}
+        self.dictionary = []
+
+    def add(self, doc_id, order, data):
+        '''Adds the counts of one ngram order of one document
+        Takes the document ID (int, or COMBINED_DOC_ID), the ngram order
+        and the (ngram text, count) tuples'''
+        for text, count in data:
+            ngram_id = self.ngram_ids.get(text)
+            if ngram_id is None:
+                ngram_id = self.ngram_ids[text] = len(self.dictionary)
+                self.dictionary.append(text)
+            self.doc_ids.append(doc_id)
+            self.orders.append(order)
+            self.ngrams.append(ngram_id)
+            self.counts.append(count)
+
+    def save(self, path):
+        '''Writes the collected counts to an uncompressed .npz file'''
+        np.savez(path,
+                 doc_id=np.frombuffer(self.doc_ids, dtype=np.dtype('l')).astype(np.int64),
+                 order=np.frombuffer(self.orders, dtype=np.int8),
+                 ngram=np.frombuffer(self.ngrams, dtype=np.int32),
+                 count=np.frombuffer(self.counts, dtype=np.dtype('l')).astype(np.int64),
+                 dictionary=np.array(self.dictionary, dtype=str))
+
+
+def load_counts(path):
+    '''Opens a file written by ColumnarCountWriter
+    Takes the path of the .npz file
+    Returns dict of column name to read-only memory-mapped array'''
+
+    with zipfile.ZipFile(path) as archive:
+        members = archive.infolist()
+
+    columns = {}
+    with open(path, 'rb') as npz_file:
+        for member in members:
+            name = member.filename[:-len('.npy')]
+            if member.compress_type != zipfile.ZIP_STORED:
+                # Compressed members can't be mapped, so read them normally
+                columns[name] = np.load(path)[name]
+                continue
+
+            # Skip the zip local file header to reach the .npy data
+            npz_file.seek(member.header_offset)
+            header = npz_file.read(30)
+            name_length, extra_length = struct.unpack('<HH', header[26:30])
+            npz_file.seek(member.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(npz_file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(npz_file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(npz_file)
+
+            if 0 in shape:
+                columns[name] = np.zeros(shape, dtype=dtype)
+            else:
+                columns[name] = np.memmap(path, dtype=dtype, mode='r', offset=npz_file.tell(),
+                                          shape=shape, order='F' if fortran_order else 'C')
+    return columns
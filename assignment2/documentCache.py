@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+'''
+Local on-disk cache for downloaded documents, shared by the patent scripts
+and the assignment1 faculty scraper.
+
+Contents are stored once per SHA-1 digest under <cache_dir>/objects, and an
+index maps each URL to its digest together with the ETag / Last-Modified
+validators the server sent. Cached URLs are revalidated with conditional
+GETs, and the least recently used entries are evicted once the stored
+contents exceed max_bytes. In offline mode only cached documents are served.
+'''
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+
+
+class CacheMiss(LookupError):
+    '''Raised in offline mode when a URL has not been cached'''
+
+
+class DocumentCache(object):
+    '''Content-addressed document cache with LRU eviction
+    Takes the cache directory, the size cap (bytes) and the offline flag'''
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=2 * 1024 ** 3, offline=False, autosave=100):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.autosave = autosave
+        self._lock = threading.RLock()
+        self._unsaved = 0
+
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as index_file:
+                self.index = json.load(index_file)
+        else:
+            self.index = {}
+
+        # Several URLs may share one object, so track references per digest
+        self._refs = Counter(entry['digest'] for entry in self.index.itervalues())
+        self._sizes = { entry['digest']: entry['size'] for entry in self.index.itervalues() }
+        self.total_bytes = sum(self._sizes.itervalues())
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest)
+
+    def _release(self, url):
+        '''Drops a URL from the index, deleting its object if no other URL uses it'''
+        digest = self.index.pop(url)['digest']
+        self._refs[digest] -= 1
+        if self._refs[digest] == 0:
+            del self._refs[digest]
+            self.total_bytes -= self._sizes.pop(digest)
+            if os.path.exists(self._object_path(digest)):
+                os.remove(self._object_path(digest))
+
+    def __contains__(self, url):
+        return url in self.index
+
+    def validators(self, url):
+        '''Returns the conditional GET headers for a cached URL (empty dict if not cached)'''
+        headers = {}
+        entry = self.index.get(url)
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def entry(self, url):
+        '''Returns the index entry for a URL and marks it as recently used
+        Raises CacheMiss if the URL is not cached'''
+        with self._lock:
+            entry = self.index.get(url)
+            if entry is None or not os.path.exists(self._object_path(entry['digest'])):
+                raise CacheMiss(url)
+            entry['accessed'] = time.time()
+            return entry
+
+    def read(self, url):
+        '''Returns the cached contents of a URL (string)
+        Raises CacheMiss if the URL is not cached'''
+        entry = self.entry(url)
+        with open(self._object_path(entry['digest']), 'rb') as blob:
+            return blob.read()
+
+    def store(self, url, response):
+        '''Saves the contents and validators of a successful response'''
+        content = response.content
+        digest = hashlib.sha1(content).hexdigest()
+        path = self._object_path(digest)
+
+        with self._lock:
+            if not os.path.exists(path):
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                # Write to a temporary name first so readers never see partial files
+                temp_path = '%s.%d.tmp' % (path, threading.current_thread().ident)
+                with open(temp_path, 'wb') as blob:
+                    blob.write(content)
+                os.rename(temp_path, path)
+
+            # Take the new reference before dropping the old one, in case both are the same object
+            if digest not in self._sizes:
+                self._sizes[digest] = len(content)
+                self.total_bytes += len(content)
+            self._refs[digest] += 1
+            if url in self.index:
+                self._release(url)
+
+            self.index[url] = {'digest': digest,
+                               'size': len(content),
+                               'etag': response.headers.get('ETag'),
+                               'last_modified': response.headers.get('Last-Modified'),
+                               'encoding': response.encoding,
+                               'accessed': time.time()}
+            self.evict()
+
+            self._unsaved += 1
+            if self._unsaved >= self.autosave:
+                self.save()
+
+    def evict(self):
+        '''Removes least recently used entries until the cache fits in max_bytes'''
+        with self._lock:
+            if self.total_bytes <= self.max_bytes:
+                return
+            by_age = sorted(self.index, key=lambda url: self.index[url]['accessed'])
+            for url in by_age:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                self._release(url)
+
+    def save(self):
+        '''Writes the index to disk'''
+        with self._lock:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            temp_path = self.index_path + '.tmp'
+            with open(temp_path, 'w') as index_file:
+                json.dump(self.index, index_file)
+            os.rename(temp_path, self.index_path)
+            self._unsaved = 0
@@ -0,0 +1,85 @@
+import heapq
+
+'''
+Bounded-memory approximate counting of the most frequent ngrams.
+
+SpaceSaving (Metwally, Agrawal & El Abbadi, 2005) keeps at most `capacity`
+counters. When a new key arrives and the table is full, the key with the
+smallest count is replaced and the new key inherits that count as its
+possible overcount. Every reported count is an upper bound on the true
+count, the true count is at least count - error, and no error exceeds
+total / capacity. Any key whose true count is above total / capacity is
+guaranteed to be in the table.
+'''
+
+
+class SpaceSaving(object):
+    '''Heavy hitters sketch with a fixed number of counters
+    Takes the maximum number of keys to track'''
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # Min-heap of (count, key). Entries go stale when a count grows and
+        # are skipped when popped; the heap is rebuilt when it gets too big.
+        self._heap = []
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _pop_min(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return count, key
+
+    def _rebuild(self):
+        self._heap = [(count, key) for key, count in self.counts.iteritems()]
+        heapq.heapify(self._heap)
+
+    def add(self, key, count=1):
+        '''Counts count more occurrences of key'''
+        self.total += count
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+        elif len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+        else:
+            min_count, min_key = self._pop_min()
+            del counts[min_key]
+            del self.errors[min_key]
+            counts[key] = min_count + count
+            self.errors[key] = min_count
+
+        heapq.heappush(self._heap, (counts[key], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild()
+
+    def update(self, counts):
+        '''Adds a dict of key to count, like Counter.update'''
+        for key, count in counts.iteritems():
+            self.add(key, count)
+
+    def iteritems(self):
+        return self.counts.iteritems()
+
+    def error_bound(self):
+        '''Returns the largest possible overcount of any reported key'''
+        return self.total / float(self.capacity)
+
+    def guaranteed(self, top):
+        '''Counts the reported keys that are certainly among the true top keys
+        Takes the (key, count) list reported for the top N keys
+        Returns the number of those keys whose lowest possible count is at
+        least the highest possible count of every key left out'''
+        reported = set(key for key, count in top)
+        # Untracked keys can have occurred at most as often as the smallest counter
+        threshold = min(self.counts.itervalues()) if len(self.counts) == self.capacity else 0
+        for key, count in self.counts.iteritems():
+            if key not in reported and count > threshold:
+                threshold = count
+        return sum(1 for key, count in top if count - self.errors[key] >= threshold)
@@ -0,0 +1,242 @@
+from collections import Counter, deque
+from itertools import islice
+from multiprocessing import Pool
+from textNormalizer import normalizer
+from heavyHitters import SpaceSaving
+
+'''
+Streaming unigram, bigram and trigram counting.
+
+Words are consumed one at a time from any iterable (e.g. a generator from
+the text normalizer) and counted straight into per-document tables, which
+are then folded into running aggregate tables. No ngram lists are built, so
+memory grows with the number of distinct ngrams rather than the number of
+ngram occurrences.
+
+Words are interned in a Vocabulary that maps each stem to a small integer
+id. Bigrams and trigrams are packed into a single integer key (WORD_BITS
+bits per word, so a trigram fits in 63 bits) instead of tuples of strings,
+and are only decoded back to text when they are written out.
+
+Documents can also be counted in a pool of worker processes. Each worker
+counts a shard of documents with its own vocabulary and hands every
+document's counts to a callback (e.g. one that sorts and writes its files)
+right there. The shard aggregate counts go back to the parent keyed by
+ngram text, which means the same thing in every process, so the parent
+adds them to its totals without translating any keys: ngrams it hasn't
+seen yet are copied in by dict.update, and only the ngrams already in its
+totals are summed one by one.
+'''
+
+WORD_BITS = 21
+WORD_MASK = (1 << WORD_BITS) - 1
+
+
+class Vocabulary(object):
+    '''Assigns integer ids to words and decodes packed ngram keys'''
+
+    def __init__(self):
+        self.ids = {}
+        self.words = []
+
+    def __len__(self):
+        return len(self.words)
+
+    def intern(self, word):
+        '''Takes a word (string)
+        Returns its id (int), assigning the next free id to new words'''
+        word_id = self.ids.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            if word_id > WORD_MASK:
+                raise OverflowError('vocabulary exceeds %d words' % (WORD_MASK + 1))
+            self.ids[word] = word_id
+            self.words.append(word)
+        return word_id
+
+    def decode(self, key, order):
+        '''Takes a packed ngram key (int) and the ngram order (1, 2 or 3)
+        Returns the ngram as text, e.g. "support member"'''
+        if order == 1:
+            return self.words[key]
+        words = []
+        for _ in range(order):
+            words.append(self.words[key & WORD_MASK])
+            key >>= WORD_BITS
+        words.reverse()
+        return ' '.join(words)
+
+    def encode(self, ngram):
+        '''Takes an ngram of known words as text, e.g. "support member"
+        Returns its packed ngram key (int)'''
+        key = 0
+        for word in ngram.split(' '):
+            key = (key << WORD_BITS) | self.ids[word]
+        return key
+
+
+class TextVocabulary(object):
+    '''Stands in for a Vocabulary when the ngram keys are already text'''
+
+    def decode(self, key, order):
+        return key
+
+    def encode(self, ngram):
+        return ngram
+
+
+def count_document_ngrams(words, vocabulary):
+    '''Counts the ngrams of a single document in one pass
+    Takes words (iterable of strings) and the Vocabulary used to intern them
+    Returns a tuple of three Counters for unigrams, bigrams and trigrams,
+    keyed by packed integer ngram keys'''
+
+    unigrams = Counter()
+    bigrams = Counter()
+    trigrams = Counter()
+    intern = vocabulary.intern
+
+    # The sliding window starts empty for each document, so bigrams and
+    # trigrams never cross the boundary between documents
+    previous = previous_bigram = None
+    for word in words:
+        word_id = intern(word)
+        unigrams[word_id] += 1
+        if previous is not None:
+            bigram = (previous << WORD_BITS) | word_id
+            bigrams[bigram] += 1
+            if previous_bigram is not None:
+                trigrams[(previous_bigram << WORD_BITS) | word_id] += 1
+            previous_bigram = bigram
+        previous = word_id
+
+    return unigrams, bigrams, trigrams
+
+
+class NgramCounter(object):
+    '''Counts ngrams per document while keeping running corpus totals
+    Takes an optional capacity: if given, the corpus totals are approximate
+    SpaceSaving sketches holding at most that many ngrams per order.
+    With text_keys the totals are keyed by ngram text instead of packed
+    keys, and are only filled in by merge()'''
+
+    def __init__(self, capacity=None, text_keys=False):
+        self.vocabulary = TextVocabulary() if text_keys else Vocabulary()
+        if capacity is None:
+            self.unigrams = Counter()
+            self.bigrams = Counter()
+            self.trigrams = Counter()
+        else:
+            self.unigrams = SpaceSaving(capacity)
+            self.bigrams = SpaceSaving(capacity)
+            self.trigrams = SpaceSaving(capacity)
+
+    def add_document(self, words):
+        '''Takes words (iterable of strings) for one document
+        Returns the document's unigram, bigram and trigram Counters'''
+        counts = count_document_ngrams(words, self.vocabulary)
+        for aggregate, document_counts in zip(self.aggregates(), counts):
+            aggregate.update(document_counts)
+        return counts
+
+    def aggregates(self):
+        '''Returns the corpus-wide unigram, bigram and trigram Counters'''
+        return self.unigrams, self.bigrams, self.trigrams
+
+    def text_aggregates(self):
+        '''Returns the unigram, bigram and trigram totals keyed by ngram text (dicts)'''
+        # Same as Vocabulary.decode, written out per order for speed
+        words = self.vocabulary.words
+        unigrams = { words[key]: count for key, count in self.unigrams.iteritems() }
+        bigrams = { words[key >> WORD_BITS] + ' ' + words[key & WORD_MASK]: count
+                    for key, count in self.bigrams.iteritems() }
+        trigrams = { words[key >> 2 * WORD_BITS] + ' ' + words[key >> WORD_BITS & WORD_MASK] + ' '
+                     + words[key & WORD_MASK]: count for key, count in self.trigrams.iteritems() }
+        return unigrams, bigrams, trigrams
+
+    def merge(self, aggregates):
+        '''Adds aggregate counts to the totals of a text_keys counter
+        Takes unigram, bigram and trigram counts keyed by ngram text (dicts)'''
+        for aggregate, counts in zip(self.aggregates(), aggregates):
+            if not isinstance(aggregate, Counter):
+                aggregate.update(counts)
+                continue
+            # Sum the ngrams counted on both sides, copy the rest as they are
+            sums = { ngram: aggregate[ngram] + counts[ngram]
+                     for ngram in filter(aggregate.__contains__, counts) }
+            dict.update(aggregate, counts)
+            dict.update(aggregate, sums)
+
+
+def count_shard(shard, handle_document):
+    '''Counts a shard of documents (runs in a worker process)
+    Takes a list of (document ID, document) tuples and the function called
+    with each document's ID, counts and vocabulary
+    Returns a tuple of a list of (document ID, handle_document result)
+    tuples, the shard's aggregate counts keyed by ngram text and the stems
+    learned as (word, stem) tuples with hit and miss counts'''
+    stemmer = normalizer.stemmer
+    stemmer.learned = []
+    hits, misses = stemmer.hits, stemmer.misses
+    counter = NgramCounter()
+    documents = []
+    for doc_id, document in shard:
+        counts = counter.add_document(normalizer.iter_normalize(document))
+        documents.append((doc_id, handle_document(doc_id, counts, counter.vocabulary)))
+    stems = (stemmer.learned, stemmer.hits - hits, stemmer.misses - misses)
+    stemmer.learned = None
+    return documents, counter.text_aggregates(), stems
+
+
+def shards(documents, shard_size):
+    '''Groups (document ID, document) tuples into lists of shard_size'''
+    shard = []
+    for item in documents:
+        shard.append(item)
+        if len(shard) == shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def count_serially(documents, counter, handle_document):
+    '''Counts documents in this process
+    Takes (document ID, document) tuples, the NgramCounter for the aggregates
+    and the function called with each document's ID, counts and vocabulary
+    Yields (document ID, handle_document result) tuples'''
+    for doc_id, document in documents:
+        counts = counter.add_document(normalizer.iter_normalize(document))
+        yield doc_id, handle_document(doc_id, counts, counter.vocabulary)
+
+
+def count_in_processes(documents, counter, processes, handle_document, shard_size=16, max_pending=None):
+    '''Counts documents in a pool of worker processes
+    Takes (document ID, document) tuples, the text_keys NgramCounter that
+    the shard aggregates are merged into, the number of processes, the
+    function each worker calls with a document's ID, counts and vocabulary
+    (it must be picklable, e.g. a module function or a partial of one), the
+    number of documents per shard and the most shards queued at once
+    (2 per process by default)
+    Yields (document ID, handle_document result) tuples as shards complete'''
+
+    max_pending = max_pending or 2 * processes
+    # Start the workers before documents are pulled, so they are forked
+    # before any fetcher threads exist
+    pool = Pool(processes)
+    try:
+        pending = deque()
+        documents = shards(documents, shard_size)
+        while True:
+            # Documents are only pulled while there is room in the queue
+            for shard in islice(documents, max_pending - len(pending)):
+                pending.append(pool.apply_async(count_shard, (shard, handle_document)))
+            if not pending:
+                break
+            shard_documents, aggregates, stems = pending.popleft().get()
+            counter.merge(aggregates)
+            normalizer.stemmer.merge(*stems)
+            for doc_id, result in shard_documents:
+                yield doc_id, result
+    finally:
+        pool.terminate()
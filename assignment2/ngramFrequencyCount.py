@@ -1,109 +1,136 @@
-import requests
-import csv
-import nltk
-from nltk.util import ngrams
-from nltk.corpus import stopwords
-from nltk.tokenize import RegexpTokenizer
-from nltk.stem.porter import *
+import os
+from functools import partial
+from patentFetcher import PatentFetcher
+from documentCache import DocumentCache
+from textNormalizer import normalizer
+from ngramCounter import NgramCounter, count_serially, count_in_processes
+from ngramOutput import count_unique_ngrams, write_count_file, write_document_files
+from ngramStore import NgramStore
+from columnarCounts import ColumnarCountWriter, COMBINED_DOC_ID
 
 # Retrieve documents from server
 url = 'https://s3-us-west-2.amazonaws.com/uspto-patentsclaims/'
 ids = range(6334220, 6334230) # range of document IDs to fetch
 
+concurrency = 16 # number of documents to download at once
+offline = False # only use documents already in the local cache
+stem_cache = 'cache/stems.json' # word -> stem table kept between runs
+processes = 1 # worker processes for counting; 1 counts in this process
+shard_size = 16 # documents counted per task when processes > 1
+top = None # keep only this many of the most frequent ngrams in the combined files
+approximate = False # count the combined files in fixed memory (approximate counts, needs incremental = False)
+capacity = 100000 # ngrams tracked per order when approximate
+incremental = True # only count documents not yet in the ngram store
+store_path = 'cache/ngrams.db' # per-document counts kept between runs
+replace_ids = [] # document IDs to count again even if stored
+remove_ids = [] # document IDs to subtract from the combined files
+columnar = False # also write every document's counts to one columnar file
+columnar_path = 'output/ngrams.npz'
+
 # Coerce numbers to strings for use as dict keys
 ids = [str(doc_id) for doc_id in ids]
 
-# Store contents of each document in dictionary
-print 'Retrieving patent documents from server'
-documents = {}
-for doc_id in ids:
-    documents[doc_id] = requests.get(url + doc_id + '.txt').content
-
-    # Prepares a document for word analysis by removing punctuation
-# and stop words, and then reducing remaining words to their stems
-# Takes a document (string) and returns words (list of strings)
-def stop_and_stem(document):
-    # Convert to lowercase and remove punctuation from text
-    tokenizer = RegexpTokenizer(r'[a-z]+')
-    document = document.lower()
-    document = tokenizer.tokenize(document)
-    
-    # Remove stop words
-    stop = stopwords.words('english')
-    words = [word for word in document if word not in stop]
-    
-    # Reduce words to their stem (truncate suffix)
-    stemmer = PorterStemmer()
-    words = [stemmer.stem(word) for word in words]
-    
-    # Function above returns unicode. Return to ASCII.
-    words = [x.encode('UTF8') for x in words]
-    
-    return words
-
-# Counts the unique occurences of ngrams in a list
-# Takes a set of ngrams (list of strings or tuples)
-# and returns a sorted list of tuples with frequency count.
-# e.g. [('Hey', 'friend')...] --> [(('Hey', 'friend'), 4)...]
-def count_unique_ngrams(ngrams):
-    freq = nltk.FreqDist(ngrams).items()
-    freq = sorted(freq, key=lambda tup: tup[-1], reverse=True)
-    return freq
-
-
-# Write the data to a local file
-# Takes the name of the file to be written (string)
-# and the data to be written (list of tuples).  
-def write_count_file(file_name, data):
-    with open('output/' + file_name + '.csv', 'w') as write_file:
-        writer = csv.writer(write_file)
-        for ngram, count in data:
-            # for cleaner display, print ngram tuples as plain text
-            if isinstance(ngram, tuple):
-                ngram = ' '.join(map(str, ngram))
-            values = [ngram, count]
-            writer.writerow(values)
-
-# In order to aggregate ngrams across all documents      
-unigrams_agg = []
-bigrams_agg = []
-trigrams_agg = []
-
-# Process each document
-print 'Creating ngram frequency count files'
-for doc_id, document in documents.items():
-    # Remove punctuation, stop words, and stem
-    words = stop_and_stem(document)
-    
-    # Hold the ngrams
-    unigrams = words
-    bigrams = list(nltk.bigrams(words))
-    trigrams = list(nltk.trigrams(words))
-    
-    # Add ngrams to the aggregates
-    unigrams_agg += unigrams
-    bigrams_agg += bigrams
-    trigrams_agg += trigrams
-    
-    # Create tuple with unique ngram and frequency count 
-    unigrams_count = count_unique_ngrams(unigrams)
-    bigrams_count = count_unique_ngrams(bigrams)
-    trigrams_count = count_unique_ngrams(trigrams)
-    
-    # Write data to file per ngram per document
-    write_count_file('unigrams-' + doc_id, unigrams_count)
-    write_count_file('bigrams-' + doc_id, bigrams_count)
-    write_count_file('trigrams-' + doc_id, trigrams_count)
+normalizer.stemmer.load(stem_cache)
+
+# Checks whether all ngram files of a document were already written
+def has_count_files(doc_id):
+    return all(os.path.exists('output/' + name + '-' + doc_id + '.csv')
+               for name in ['unigrams', 'bigrams', 'trigrams'])
+
+# Documents already counted by an earlier run are skipped, their
+# counts come from the store when the combined files are written
+store = None
+if incremental:
+    store = NgramStore(store_path)
+    for doc_id in remove_ids:
+        store.remove_document(doc_id)
+        for name in ['unigrams', 'bigrams', 'trigrams']:
+            if os.path.exists('output/' + name + '-' + doc_id + '.csv'):
+                os.remove('output/' + name + '-' + doc_id + '.csv')
+    ids = [doc_id for doc_id in ids if doc_id not in remove_ids]
+    ids = [doc_id for doc_id in ids
+           if doc_id in replace_ids or doc_id not in store or not has_count_files(doc_id)]
+    print '%d new or replaced documents to count' % len(ids)
 
+    # The store already holds exact totals, so they are not approximated
+    if approximate:
+        print 'Ignoring approximate: the combined files come from the exact totals in the store'
+        approximate = False
+
+# All counts of the run can also go to a single columnar file
+columnar_writer = ColumnarCountWriter() if columnar else None
+
+# In order to aggregate ngrams across all documents.
+# Counts are kept as running totals instead of lists of every ngram.
+# Totals merged from worker processes are keyed by ngram text
+counter = NgramCounter(capacity if approximate else None, text_keys=processes > 1)
+vocabulary = counter.vocabulary
+
+# Documents are yielded as they arrive, so each one is processed
+# while the rest are still downloading
+print 'Retrieving patent documents and creating ngram frequency count files'
+cache = DocumentCache(offline=offline)
+fetcher = PatentFetcher(url, concurrency, cache=cache)
+documents = fetcher.fetch(ids)
+
+# Remove punctuation, stop words, and stem. Words are streamed
+# straight into the counts for each document and the aggregates.
+# Each document's files are sorted and written by the process that
+# counted it; the sorted tables only come back if they are stored
+handle_document = partial(write_document_files,
+                          keep_tables=store is not None or columnar_writer is not None)
+if processes > 1:
+    counted = count_in_processes(documents, counter, processes, handle_document, shard_size)
+else:
+    counted = count_serially(documents, counter, handle_document)
+
+counted_ids = set()
+for doc_id, tables in counted:
+    counted_ids.add(doc_id)
+    if columnar_writer is not None:
+        for order, data in enumerate(tables, 1):
+            columnar_writer.add(int(doc_id), order, data)
+
+    if store is not None:
+        store.add_document(doc_id, tables)
+
+# The combined files cover every stored document, not just this run's,
+# and so does the columnar file: documents skipped this time are read back
+if store is not None:
+    if columnar_writer is not None:
+        for doc_id in store.doc_ids():
+            if doc_id not in counted_ids:
+                for order, data in enumerate(store.document_tables(doc_id), 1):
+                    columnar_writer.add(int(doc_id), order, data)
+    counter = store.load_aggregates(NgramCounter())
+    vocabulary = counter.vocabulary
+    store.close()
     
 # Get counts for ngrams aggregated across all documents
-unigrams_agg = count_unique_ngrams(unigrams_agg)
-bigrams_agg = count_unique_ngrams(bigrams_agg)
-trigrams_agg = count_unique_ngrams(trigrams_agg)
+unigrams_agg = count_unique_ngrams(counter.unigrams, vocabulary, 1, top)
+bigrams_agg = count_unique_ngrams(counter.bigrams, vocabulary, 2, top)
+trigrams_agg = count_unique_ngrams(counter.trigrams, vocabulary, 3, top)
+
+# Approximate counts may be too high by up to the error bound
+if approximate:
+    for name, sketch, agg in zip(['unigrams', 'bigrams', 'trigrams'], counter.aggregates(),
+                                 [unigrams_agg, bigrams_agg, trigrams_agg]):
+        print '%s: counts overestimated by at most %.1f, %d of top %d certain' % (
+            name, sketch.error_bound(),
+            sketch.guaranteed([(vocabulary.encode(ngram), count) for ngram, count in agg]), len(agg))
 
 # Write those to files as well
 write_count_file('unigrams-combined', unigrams_agg)
 write_count_file('bigrams_combined', bigrams_agg)
 write_count_file('trigrams_combined', trigrams_agg)
 
+if columnar_writer is not None:
+    for order, data in enumerate([unigrams_agg, bigrams_agg, trigrams_agg], 1):
+        columnar_writer.add(COMBINED_DOC_ID, order, data)
+    columnar_writer.save(columnar_path)
+
+cache.save()
+normalizer.stemmer.save(stem_cache)
+print 'Stem cache hit rate: %.1f%%' % (100 * normalizer.stemmer.hit_rate())
+
 print 'Complete'
\ No newline at end of file
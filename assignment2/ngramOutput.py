@@ -0,0 +1,59 @@
+import csv
+import heapq
+from operator import itemgetter
+
+'''
+Sorted ngram tables and the CSV files written from them.
+
+Each packed ngram key is decoded to text once, and the table is sorted in
+two stable passes, by text and then by count, so ties come out in text
+order without decoding keys inside the sort key. The per-document files
+are written by whichever process counted the document, so with several
+worker processes the sorting and writing is spread over the pool too.
+'''
+
+
+def count_unique_ngrams(ngram_counts, vocabulary, order, top=None):
+    '''Sorts the unique ngrams by their frequency count
+    Takes ngram counts (dict of packed ngram key to int), the vocabulary,
+    the ngram order and optionally the number of top ngrams to keep
+    Returns a sorted list of (ngram text, count) tuples,
+    e.g. {key: 4...} --> [("support member", 4)...]
+    Ties are ordered by ngram text, so output does not depend on which ids
+    the words were given (or on whether counting ran in several processes)'''
+    if top is not None and top <= 0:
+        return []
+    freq = ngram_counts.iteritems()
+    if top is not None:
+        # Find the count of the top-th ngram with a heap, then only sort
+        # the ngrams at or above it instead of the whole long tail
+        top_counts = heapq.nlargest(top, (count for ngram, count in ngram_counts.iteritems()))
+        if len(top_counts) == top:
+            freq = [tup for tup in ngram_counts.iteritems() if tup[-1] >= top_counts[-1]]
+    decode = vocabulary.decode
+    freq = [(decode(ngram, order), count) for ngram, count in freq]
+    freq.sort(key=itemgetter(0))
+    freq.sort(key=itemgetter(1), reverse=True)
+    return freq[:top]
+
+
+def write_count_file(file_name, data):
+    '''Writes the data to a local file
+    Takes the name of the file to be written (string) and the
+    data to be written (list of (ngram text, count) tuples)'''
+    with open('output/' + file_name + '.csv', 'w') as write_file:
+        writer = csv.writer(write_file)
+        writer.writerows(data)
+
+
+def write_document_files(doc_id, counts, vocabulary, keep_tables=False):
+    '''Sorts a document's counts and writes its unigram, bigram and trigram files
+    Takes the document ID, its unigram, bigram and trigram counts, the
+    vocabulary to decode them and whether to return the sorted tables
+    Returns the three sorted tables if keep_tables, otherwise None'''
+    tables = []
+    for order, (name, ngram_counts) in enumerate(zip(['unigrams', 'bigrams', 'trigrams'], counts), 1):
+        data = count_unique_ngrams(ngram_counts, vocabulary, order)
+        write_count_file(name + '-' + doc_id, data)
+        tables.append(data)
+    return tables if keep_tables else None
@@ -0,0 +1,120 @@
+import os
+import sqlite3
+from ngramCounter import WORD_BITS
+
+'''
+Persistent ngram counts, keyed by document ID, for incremental runs.
+
+The store keeps every counted document's ngram counts and the corpus-wide
+totals in a SQLite database. Adding a document adds its counts to the
+totals; removing or replacing a document subtracts its old counts first.
+New patents can then be counted on their own and merged in, instead of
+recounting the whole corpus for the combined files.
+'''
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS document_counts (
+    doc_id TEXT NOT NULL,
+    ngram_order INTEGER NOT NULL,
+    ngram TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (doc_id, ngram_order, ngram)
+);
+CREATE TABLE IF NOT EXISTS aggregate_counts (
+    ngram_order INTEGER NOT NULL,
+    ngram TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (ngram_order, ngram)
+);
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY
+);
+'''
+
+
+class NgramStore(object):
+    '''SQLite store of per-document and aggregate ngram counts
+    Takes the path of the database file'''
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.db = sqlite3.connect(path)
+        self.db.text_factory = str
+        self.db.executescript(SCHEMA)
+
+    def __contains__(self, doc_id):
+        row = self.db.execute('SELECT 1 FROM documents WHERE doc_id = ?', (doc_id,)).fetchone()
+        return row is not None
+
+    def doc_ids(self):
+        return [doc_id for (doc_id,) in self.db.execute('SELECT doc_id FROM documents')]
+
+    def document_tables(self, doc_id):
+        '''Takes the ID of a stored document
+        Returns its unigram, bigram and trigram tables (lists of
+        (ngram text, count) tuples sorted by count, ties by ngram text)'''
+        tables = ([], [], [])
+        rows = self.db.execute('SELECT ngram_order, ngram, count FROM document_counts WHERE doc_id = ? '
+                               'ORDER BY ngram_order, count DESC, ngram', (doc_id,))
+        for order, ngram, count in rows:
+            tables[order - 1].append((ngram, count))
+        return tables
+
+    def _subtract(self, doc_id):
+        '''Removes a document's contribution from the totals (inside a transaction)'''
+        rows = self.db.execute('SELECT count, ngram_order, ngram FROM document_counts WHERE doc_id = ?',
+                               (doc_id,)).fetchall()
+        self.db.executemany('UPDATE aggregate_counts SET count = count - ? WHERE ngram_order = ? AND ngram = ?',
+                            rows)
+        self.db.executemany('DELETE FROM aggregate_counts WHERE ngram_order = ? AND ngram = ? AND count <= 0',
+                            ((order, ngram) for count, order, ngram in rows))
+        self.db.execute('DELETE FROM document_counts WHERE doc_id = ?', (doc_id,))
+        self.db.execute('DELETE FROM documents WHERE doc_id = ?', (doc_id,))
+
+    def add_document(self, doc_id, tables):
+        '''Stores a document's counts and adds them to the totals,
+        replacing the document's previous counts if it was stored before
+        Takes the document ID and its unigram, bigram and trigram tables
+        (lists of (ngram text, count) tuples)'''
+
+        rows = [(count, order, ngram) for order, data in enumerate(tables, 1) for ngram, count in data]
+
+        with self.db:
+            self._subtract(doc_id)
+            self.db.execute('INSERT INTO documents VALUES (?)', (doc_id,))
+            self.db.executemany('INSERT INTO document_counts VALUES (?, ?, ?, ?)',
+                                ((doc_id, order, ngram, count) for count, order, ngram in rows))
+            # Upsert in two steps so older SQLite versions work too
+            self.db.executemany('INSERT OR IGNORE INTO aggregate_counts VALUES (?, ?, 0)',
+                                ((order, ngram) for count, order, ngram in rows))
+            self.db.executemany('UPDATE aggregate_counts SET count = count + ? WHERE ngram_order = ? AND ngram = ?',
+                                rows)
+
+    def remove_document(self, doc_id):
+        '''Deletes a document and subtracts its counts from the totals'''
+        with self.db:
+            self._subtract(doc_id)
+
+    def load_aggregates(self, counter, batch_size=10000):
+        '''Adds the stored totals to an NgramCounter's aggregates
+        Returns the counter'''
+        intern = counter.vocabulary.intern
+        aggregates = counter.aggregates()
+        batches = [{}, {}, {}]
+        for order, ngram, count in self.db.execute('SELECT ngram_order, ngram, count FROM aggregate_counts'):
+            key = 0
+            for word in ngram.split(' '):
+                key = (key << WORD_BITS) | intern(word)
+            batch = batches[order - 1]
+            batch[key] = count
+            if len(batch) == batch_size:
+                aggregates[order - 1].update(batch)
+                batch.clear()
+        for aggregate, batch in zip(aggregates, batches):
+            aggregate.update(batch)
+        return counter
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,132 @@
+import sys
+import threading
+import time
+from Queue import Queue
+from itertools import islice
+from multiprocessing.pool import ThreadPool
+
+import requests
+from requests.adapters import HTTPAdapter
+from documentCache import CacheMiss
+
+'''
+Fetches patent documents from the server through a bounded pool of threads.
+
+Each worker thread keeps its own requests.Session so keep-alive connections
+are reused across documents instead of opening a new one per request.
+Documents are yielded as soon as they arrive, so the caller can tokenize
+one document while the rest are still downloading. At most twice as many
+documents as there are threads are requested ahead of the caller, so a
+slow caller doesn't pile the whole ID range up in memory. When a DocumentCache is
+given, cached documents are revalidated with conditional GETs (or served
+without touching the network in offline mode). Missing documents (4xx
+responses) are skipped with a message, since large ID ranges have gaps, and
+so are uncached documents in offline mode.
+'''
+
+PATENT_URL = 'https://s3-us-west-2.amazonaws.com/uspto-patentsclaims/'
+
+
+class PatentFetcher(object):
+    '''Concurrent document fetcher with per-request timeouts and retries
+    Takes the base url, the number of concurrent requests, a timeout (seconds),
+    the number of retries, the base backoff delay (seconds) and an optional DocumentCache'''
+
+    def __init__(self, url=PATENT_URL, concurrency=8, timeout=10, retries=3, backoff=0.5, cache=None):
+        self.url = url
+        self.cache = cache
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._local = threading.local()
+
+    def session(self):
+        '''Returns the keep-alive session owned by the calling thread'''
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    def fetch_one(self, doc_id):
+        '''Fetches a single document, retrying with exponential backoff
+        Takes a document ID (string)
+        Returns a tuple of document ID and contents (string), or of document
+        ID and None if the server has no such document (or, offline, if it
+        isn't cached)'''
+
+        doc_url = self.url + doc_id + '.txt'
+        if self.cache is not None and self.cache.offline:
+            try:
+                return doc_id, self.cache.read(doc_url)
+            except CacheMiss:
+                print 'Skipping %s: not cached' % doc_id
+                return doc_id, None
+
+        headers = self.cache.validators(doc_url) if self.cache is not None else {}
+        attempt = 0
+        while True:
+            try:
+                response = self.session().get(doc_url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code == 304 and headers:
+                    try:
+                        return doc_id, self.cache.read(doc_url)
+                    except CacheMiss:
+                        # The index outlived the cached object (e.g. it was
+                        # evicted before the index was saved), so fetch in full
+                        headers = {}
+                        continue
+                if 400 <= response.status_code < 500:
+                    print 'Skipping %s: %s' % (doc_id, response.status_code)
+                    return doc_id, None
+                # Only server errors are worth retrying
+                if response.status_code < 500 or attempt == self.retries:
+                    response.raise_for_status()
+                    if self.cache is not None:
+                        self.cache.store(doc_url, response)
+                    return doc_id, response.content
+            time.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
+
+    def _fetch_into(self, doc_id, arrived):
+        '''Runs fetch_one in a pool thread and puts the outcome in the arrived
+        queue as (document ID, contents, exception info or None)'''
+        try:
+            arrived.put(self.fetch_one(doc_id) + (None,))
+        except Exception:
+            arrived.put((doc_id, None, sys.exc_info()))
+
+    def fetch(self, ids):
+        '''Fetches documents concurrently
+        Takes document IDs (iterable of strings)
+        Yields (document ID, contents) tuples in order of arrival, leaving
+        out skipped documents'''
+
+        pool = ThreadPool(self.concurrency)
+        arrived = Queue()
+        ids = iter(ids)
+        pending = 0
+        try:
+            while True:
+                # Only request more documents as the caller takes them
+                for doc_id in islice(ids, 2 * self.concurrency - pending):
+                    pool.apply_async(self._fetch_into, (doc_id, arrived))
+                    pending += 1
+                if not pending:
+                    return
+                doc_id, document, error = arrived.get()
+                pending -= 1
+                if error is not None:
+                    raise error[0], error[1], error[2]
+                if document is not None:
+                    yield doc_id, document
+        finally:
+            pool.terminate()
@@ -1,6 +1,5 @@
-from boto.s3.connection import S3Connection
-from boto.s3.key import Key
 import os.path
+from s3Uploader import BotoBackend, S3Uploader
 
 # Specify S3 Bucket and AWS Credentials
 bucket_name = '<bucket-name>'
@@ -14,9 +13,13 @@ destDir = 'ngram-output/' # S3
 # Set expiration on S3 signature links 
 link_expiration_time = 60*60*24*30 # 30 days
 
-# Connect to bucket
-conn = S3Connection(access_key, secret_key)
-bucket = conn.get_bucket(bucket_name)
+concurrency = 16 # number of files to upload at once
+sync = True # skip files whose contents are already in the bucket
+manifest_path = 'cache/uploadManifest.json' # local file hashes kept between runs
+
+# Connect to bucket (one keep-alive connection per upload thread)
+backend = BotoBackend(bucket_name, access_key, secret_key)
+uploader = S3Uploader(backend, concurrency)
 
 qsa_urls = [] 
 uploadFileNames = []
@@ -27,19 +30,19 @@ for (sourceDir, dirname, filename) in os.walk(sourceDir):
     break
 
 # Upload to S3
+# Files are made private in the same request, so access requires a signature link
 print 'Uploading ngram files to Amazon S3 bucket %s' % bucket_name
-for filename in uploadFileNames:
-    sourcepath = os.path.join(sourceDir + filename)
-    destpath = os.path.join(destDir, filename)
-     
-    # Create new key in bucket and upload file to path
-    k = Key(bucket)
-    k.key = destpath
-    k.set_contents_from_filename(sourcepath)
-    
-    # Make access to file private unless signature link is used
-    k.set_canned_acl('private')
-    qsa_urls.append(k.generate_url(link_expiration_time))
+uploads = [(os.path.join(sourceDir + filename), os.path.join(destDir, filename))
+           for filename in uploadFileNames]
+if sync:
+    uploaded, bytes_saved = uploader.sync(uploads, destDir, manifest_path)
+    print '%d of %d files changed, %d bytes not re-uploaded' % (len(uploaded), len(uploads), bytes_saved)
+else:
+    uploaded = list(uploader.upload(uploads))
+
+# Signature links are generated for every file, uploaded this run or not
+for sourcepath, destpath in uploads:
+    qsa_urls.append(backend.generate_url(destpath, link_expiration_time))
 
 print 'Upload complete. Signature URLs for files: '
 for url in qsa_urls:
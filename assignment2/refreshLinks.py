@@ -0,0 +1,31 @@
+import os.path
+from urlSigner import sign_urls, write_manifest
+
+# Specify S3 Bucket and AWS Credentials
+bucket_name = '<bucket-name>'
+access_key = '<access-key>'
+secret_key = '<secret-key>'
+
+# Files whose links are refreshed, and their location in the bucket
+sourceDir = 'output/' # local
+destDir = 'ngram-output/' # S3
+
+# Set expiration on S3 signature links
+link_expiration_time = 60*60*24*30 # 30 days
+
+# Where to write the links (.json or .csv)
+manifest_path = 'qsaLinks.csv'
+
+# Gather file names from source directory
+filenames = []
+for (sourceDir, dirname, filename) in os.walk(sourceDir):
+    filenames.extend(sorted(filename))
+    break
+
+# Sign all links locally, no upload or network access needed
+print 'Signing %d links for bucket %s' % (len(filenames), bucket_name)
+key_names = [os.path.join(destDir, filename) for filename in filenames]
+urls = sign_urls(bucket_name, access_key, secret_key, key_names, link_expiration_time)
+
+write_manifest(manifest_path, filenames, urls)
+print 'Signature URLs saved in %s' % manifest_path
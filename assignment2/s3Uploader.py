@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from multiprocessing.pool import ThreadPool
+
+from boto.s3.connection import S3Connection
+from boto.s3.key import Key
+
+'''
+Concurrent upload of the ngram output files to S3.
+
+Files are uploaded by a bounded pool of threads. The private ACL is sent
+with the PUT itself instead of in a second request, and files larger than
+multipart_threshold are sent as a multipart upload. The storage backend is
+pluggable: BotoBackend talks to S3 (or any S3-compatible server given its
+host and port), and FilesystemBackend copies files into a local directory
+so the upload stage can be exercised without AWS.
+
+In sync mode only new or changed files are uploaded. The remote ETags are
+fetched in one listing and compared with the local files' MD5 digests (or
+multipart ETags), which are kept in a manifest so unchanged files are not
+hashed again.
+'''
+
+MB = 1024 * 1024
+
+
+class BotoBackend(object):
+    '''Stores objects in an S3 bucket through boto, one connection per thread
+    Takes the bucket name, AWS credentials and extra S3Connection arguments
+    (e.g. host, port, is_secure for a local S3-compatible server)'''
+
+    def __init__(self, bucket_name, access_key, secret_key, **connection_args):
+        self.bucket_name = bucket_name
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.connection_args = connection_args
+        self._local = threading.local()
+
+    def bucket(self):
+        '''Returns the bucket through the calling thread's keep-alive connection'''
+        bucket = getattr(self._local, 'bucket', None)
+        if bucket is None:
+            conn = S3Connection(self.access_key, self.secret_key, **self.connection_args)
+            bucket = conn.get_bucket(self.bucket_name, validate=False)
+            self._local.bucket = bucket
+        return bucket
+
+    def put(self, path, key_name):
+        '''Uploads a file in a single private PUT'''
+        k = Key(self.bucket())
+        k.key = key_name
+        k.set_contents_from_filename(path, policy='private')
+
+    def put_multipart(self, path, key_name, part_size):
+        '''Uploads a file in parts of part_size bytes, created private'''
+        upload = self.bucket().initiate_multipart_upload(key_name, policy='private')
+        try:
+            size = os.path.getsize(path)
+            with open(path, 'rb') as source:
+                for part_num, offset in enumerate(range(0, size, part_size), 1):
+                    source.seek(offset)
+                    upload.upload_part_from_file(source, part_num, size=min(part_size, size - offset))
+            upload.complete_upload()
+        except Exception:
+            upload.cancel_upload()
+            raise
+
+    def generate_url(self, key_name, expires_in):
+        '''Returns a query string authenticated URL for a key'''
+        k = Key(self.bucket())
+        k.key = key_name
+        return k.generate_url(expires_in)
+
+    def list_etags(self, prefix):
+        '''Returns dict of key name to ETag for every key under prefix'''
+        # boto pages through the listing, 1000 keys per request
+        return { k.name: k.etag.strip('"') for k in self.bucket().list(prefix=prefix) }
+
+
+class FilesystemBackend(object):
+    '''Stores objects as files under a local directory, standing in for S3
+    Takes the directory to copy uploads into'''
+
+    def __init__(self, root):
+        self.root = root
+
+    def _target(self, key_name):
+        target = os.path.join(self.root, key_name)
+        if not os.path.isdir(os.path.dirname(target)):
+            try:
+                os.makedirs(os.path.dirname(target))
+            except OSError:
+                if not os.path.isdir(os.path.dirname(target)):
+                    raise
+        return target
+
+    def put(self, path, key_name):
+        shutil.copyfile(path, self._target(key_name))
+
+    def put_multipart(self, path, key_name, part_size):
+        with open(path, 'rb') as source:
+            with open(self._target(key_name), 'wb') as target:
+                for part in iter(lambda: source.read(part_size), ''):
+                    target.write(part)
+
+    def generate_url(self, key_name, expires_in):
+        return 'file://' + os.path.abspath(os.path.join(self.root, key_name))
+
+    def list_etags(self, prefix):
+        etags = {}
+        for directory, dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                key_name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                if key_name.startswith(prefix):
+                    etags[key_name] = file_etags(path, MB)[0]
+        return etags
+
+
+def file_etags(path, part_size):
+    '''Computes the ETags S3 could report for a file
+    Takes the file path and the multipart part size (bytes)
+    Returns a tuple of the single PUT ETag (MD5 digest) and the multipart
+    ETag (MD5 of the part digests, followed by the number of parts)'''
+    whole = hashlib.md5()
+    parts = []
+    with open(path, 'rb') as source:
+        for part in iter(lambda: source.read(part_size), ''):
+            whole.update(part)
+            parts.append(hashlib.md5(part).digest())
+    multipart = '%s-%d' % (hashlib.md5(''.join(parts)).hexdigest(), len(parts))
+    return whole.hexdigest(), multipart
+
+
+class S3Uploader(object):
+    '''Uploads files concurrently through a storage backend
+    Takes the backend, the number of concurrent uploads, the file size (bytes)
+    above which multipart upload is used and the multipart part size (bytes)'''
+
+    def __init__(self, backend, concurrency=8, multipart_threshold=64 * MB, part_size=16 * MB):
+        self.backend = backend
+        self.concurrency = concurrency
+        self.multipart_threshold = multipart_threshold
+        self.part_size = max(part_size, 5 * MB) # S3 rejects smaller parts
+
+    def upload_file(self, upload):
+        '''Takes a (local path, key name) tuple
+        Returns the key name once uploaded'''
+        path, key_name = upload
+        if os.path.getsize(path) > self.multipart_threshold:
+            self.backend.put_multipart(path, key_name, self.part_size)
+        else:
+            self.backend.put(path, key_name)
+        return key_name
+
+    def upload(self, uploads):
+        '''Takes (local path, key name) tuples
+        Yields key names as their uploads complete'''
+        pool = ThreadPool(self.concurrency)
+        try:
+            for key_name in pool.imap_unordered(self.upload_file, uploads):
+                yield key_name
+        finally:
+            pool.terminate()
+
+    def sync(self, uploads, prefix, manifest_path):
+        '''Uploads only the files whose contents differ from the remote copy
+        Takes (local path, key name) tuples, the key prefix to list and the
+        path of the local manifest of file hashes
+        Returns a tuple of the uploaded key names and the bytes not uploaded'''
+
+        remote_etags = self.backend.list_etags(prefix)
+
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as manifest_file:
+                manifest = json.load(manifest_file)
+
+        changed = []
+        bytes_saved = 0
+        for path, key_name in uploads:
+            stat = os.stat(path)
+            entry = manifest.get(path)
+            # Only rehash files whose size, modification time or part size changed
+            if entry is None or [entry['size'], entry['mtime'], entry['part_size']] != [stat.st_size, stat.st_mtime, self.part_size]:
+                md5, multipart = file_etags(path, self.part_size)
+                entry = manifest[path] = {'size': stat.st_size, 'mtime': stat.st_mtime,
+                                          'part_size': self.part_size, 'md5': md5, 'multipart': multipart}
+            if remote_etags.get(key_name) in (entry['md5'], entry['multipart']):
+                bytes_saved += stat.st_size
+            else:
+                changed.append((path, key_name))
+
+        uploaded = list(self.upload(changed))
+
+        directory = os.path.dirname(manifest_path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(manifest_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        return uploaded, bytes_saved
@@ -0,0 +1,118 @@
+import json
+import os
+import re
+from collections import OrderedDict
+from nltk.corpus import stopwords
+from nltk.stem.porter import PorterStemmer
+
+'''
+Text normalization shared by the ngram counter and the assignment3 scripts.
+
+The tokenizer regex, stop word table and stemmer are built once when the
+normalizer is created instead of on every call, and each document is
+tokenized, stop word filtered and stemmed in a single pass.
+
+Stems are memoized: word frequencies are Zipfian, so a bounded table of
+recent word -> stem results turns most PorterStemmer calls into lookups,
+and the table can be saved between runs.
+'''
+
+
+class MemoStemmer(object):
+    '''Porter stemmer with a bounded least recently used cache of stems
+    Takes the maximum number of cached words'''
+
+    def __init__(self, max_size=200000):
+        self.max_size = max_size
+        self.stems = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.learned = None # list to record new (word, stem) pairs in, e.g. in a worker process
+        self._stem = PorterStemmer().stem
+
+    def stem(self, word):
+        '''Takes a word (string)
+        Returns its stem (ASCII string)'''
+        try:
+            stem = self.stems.pop(word)
+            self.hits += 1
+        except KeyError:
+            # The stemmer returns unicode. Return to ASCII.
+            stem = self._stem(word).encode('UTF8')
+            self.misses += 1
+            if self.learned is not None:
+                self.learned.append((word, stem))
+            if len(self.stems) >= self.max_size:
+                self.stems.popitem(last=False)
+        # Reinsert so the word becomes the most recently used
+        self.stems[word] = stem
+        return stem
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.0
+
+    def merge(self, learned, hits, misses):
+        '''Adds the work of another stemmer, e.g. one in a worker process
+        Takes the (word, stem) tuples it learned and its hit and miss counts'''
+        stems = self.stems
+        for word, stem in learned:
+            # Other workers often learned the same words
+            if word in stems:
+                continue
+            if len(stems) >= self.max_size:
+                stems.popitem(last=False)
+            stems[word] = stem
+        self.hits += hits
+        self.misses += misses
+
+    def save(self, path):
+        '''Writes the stem table to a JSON file, oldest entries first'''
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(path, 'w') as stem_file:
+            json.dump(self.stems.items(), stem_file)
+
+    def load(self, path):
+        '''Reads a stem table written by save(), if the file exists'''
+        if not os.path.exists(path):
+            return
+        with open(path, 'r') as stem_file:
+            for word, stem in json.load(stem_file)[-self.max_size:]:
+                self.stems[word.encode('UTF8')] = stem.encode('UTF8')
+        while len(self.stems) > self.max_size:
+            self.stems.popitem(last=False)
+
+
+class TextNormalizer(object):
+    '''Lowercases, removes punctuation and stop words, and stems documents
+    Takes an optional list of stop words (defaults to NLTK English stop words)'''
+
+    def __init__(self, stop=None):
+        self.pattern = re.compile(r'[a-z]+') # alphabetic runs only, drops punctuation
+        self.stop = frozenset(stopwords.words('english') if stop is None else stop)
+        self.stemmer = MemoStemmer()
+
+    def iter_normalize(self, document):
+        '''Takes a document (string)
+        Yields words (strings) one at a time'''
+        stop = self.stop
+        stem = self.stemmer.stem
+        for word in self.pattern.findall(document.lower()):
+            if word not in stop:
+                yield stem(word)
+
+    def normalize(self, document):
+        '''Takes a document (string)
+        Returns words (list of strings)'''
+        return list(self.iter_normalize(document))
+
+    def normalize_many(self, documents):
+        '''Takes documents (iterable of strings)
+        Returns a list of word lists, one per document'''
+        return [self.normalize(document) for document in documents]
+
+
+# Shared instance, so the setup cost is paid once per process
+normalizer = TextNormalizer()
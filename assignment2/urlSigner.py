@@ -0,0 +1,54 @@
+import base64
+import csv
+import hashlib
+import hmac
+import json
+import time
+import urllib
+
+'''
+Offline generation of query string authenticated S3 URLs.
+
+Produces the same links as boto's Key.generate_url() (AWS signature
+version 2) without any network access, so links can be refreshed without
+re-uploading. All links of a batch share one expiry time, so the HMAC is
+keyed and fed the common "GET ... /bucket/" prefix once, and each key only
+costs a copy of that state plus its own name.
+'''
+
+
+def sign_urls(bucket_name, access_key, secret_key, key_names, expires_in, now=None):
+    '''Signs GET URLs for a batch of keys
+    Takes the bucket name, AWS credentials, key names (list of strings),
+    the link lifetime (seconds) and optionally the current time (epoch seconds)
+    Returns a list of signed URLs in the same order as key_names'''
+
+    expires = int((time.time() if now is None else now) + expires_in)
+    prefix = hmac.new(secret_key, digestmod=hashlib.sha1)
+    prefix.update('GET\n\n\n%d\n/%s/' % (expires, bucket_name))
+
+    query = '&Expires=%d&AWSAccessKeyId=%s' % (expires, access_key)
+    host = 'https://%s.s3.amazonaws.com/' % bucket_name
+
+    urls = []
+    for key_name in key_names:
+        path = urllib.quote(key_name)
+        signer = prefix.copy()
+        signer.update(path)
+        signature = urllib.quote_plus(base64.b64encode(signer.digest()))
+        urls.append(host + path + '?Signature=' + signature + query)
+    return urls
+
+
+def write_manifest(path, filenames, urls):
+    '''Writes signed URLs keyed by file name
+    Takes the manifest path (.json for JSON, CSV otherwise), the file names
+    and their URLs (lists in the same order)'''
+    with open(path, 'w') as manifest_file:
+        if path.endswith('.json'):
+            json.dump(dict(zip(filenames, urls)), manifest_file, indent=1, sort_keys=True)
+        else:
+            writer = csv.writer(manifest_file)
+            writer.writerow(['filename', 'url'])
+            for filename, url in zip(filenames, urls):
+                writer.writerow([filename, url])
@@ -4,13 +4,14 @@ import lda.datasets
 import requests
 import nltk
 from nltk.util import ngrams
-from nltk.corpus import stopwords
-from nltk.tokenize import RegexpTokenizer
-from nltk.stem.porter import *
 import textmining
 from collections import Counter
 import sys, os
 
+# Text normalization is shared with assignment2
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assignment2'))
+from textNormalizer import normalizer
+
 def main():
     print 'LDA on Sample Set of Patent Documents'
     LDA_on_patent_data()
@@ -33,19 +34,7 @@ def stop_and_stem(document):
     Takes a document (string)
     Returns words (list of strings)'''
     
-    tokenizer = RegexpTokenizer(r'[a-z]+') # remove punctuation
-    document = document.lower()
-    document = tokenizer.tokenize(document)
-    
-    stop = stopwords.words('english')
-    words = [word for word in document if word not in stop]
-    
-    stemmer = PorterStemmer()
-    words = [stemmer.stem(word) for word in words]
-    
-    words = [x.encode('UTF8') for x in words] # use ASCII
-    
-    return words
+    return normalizer.normalize(document) # shared setup, single pass
 
 
 def get_TDM(documents):
@@ -1,18 +1,23 @@
 import numpy as np
 import lda
 import lda.datasets
-import requests
 import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import RegexpTokenizer
-from nltk.stem import PorterStemmer
 from scipy import cluster
 import textmining
 import sys
 import os
 import csv
+from collections import Counter, defaultdict
 import matplotlib.pylab as plt
 
+# Patent fetching, caching and text normalization are shared with assignment2
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assignment2'))
+from patentFetcher import PatentFetcher
+from documentCache import DocumentCache
+from textNormalizer import normalizer
+from StopwordFilter import StopwordFilter, load_stopwords
+from JargonEngine import sparse_codebooks, jargon_distance_matrix
+
 def main():
 
     # print 'Jargon Distance on Two Groups of Silly Sentences'
@@ -25,46 +30,71 @@ def main():
     jargon_distance_abstracts()
 
 
-def jargon_distance_among_groups(groups, stopwords):
+def jargon_distance_among_groups(groups, stopwords, processes=None):
     '''Calculates all combinations of jargon distance among a set of groups
-    Takes dict where key is group ID (int) and value is codebook for that group
+    Takes dict where key is group ID (int) and value is codebook for that group,
+    and the number of processes to spread the work over (all cores if None)
     Returns ndarray of jargon distances where row is writer group and 
     column is reader group'''
 
     groups_freq = {}
-    corpus_unigrams = []
+    stop_filter = stop_list_filter(stopwords)
 
     for gid in groups:
-        group_string = ' '.join(groups[gid])
-        group_unigrams = stop_custom_list(group_string, stopwords)
-        corpus_unigrams += group_unigrams
+        # Filter the whole group in one batch
+        group_unigrams = stop_filter.filter_group(groups[gid])
 
         groups_freq[gid] = ngram_freq(group_unigrams)
 
-    corpus_freq = ngram_freq(corpus_unigrams)
+    return jargon_distance_from_counts(groups_freq, processes)
 
-    # Calculate the Codebook and Shannon entropy once for each group
-    groups_codebooks = { group: get_codebook(group_freq, corpus_freq) for group, group_freq in groups_freq.iteritems() }
-    groups_shannon = { group: shannon_entropy(codebook) for group, codebook in groups_codebooks.iteritems() }
 
-    matrix_size = len(groups_freq)
-    distance_matrix = np.zeros((matrix_size, matrix_size))
-    
-    # Calculate jargon distance for every writer to reader combination
-    for wid in groups_freq:
-        for rid in groups_freq:
-            # Cross entropy must be calculated for each writer to reader pair
-            jargon_distance = 1 - (groups_shannon[wid] / cross_entropy(groups_codebooks[wid], groups_codebooks[rid]))
-            
-            r = wid - 1 # Use zero-based numbering for indexing matrix
-            c = rid - 1
-            distance_matrix[r, c] = jargon_distance
+def jargon_distance_from_counts(groups_freq, processes=None):
+    '''Calculates all combinations of jargon distance from word counts
+    Takes dict where key is group ID (int) and value is the group's word
+    frequencies (list of (word, count) tuples), and the number of processes
+    Returns ndarray of jargon distances where row is writer group and 
+    column is reader group'''
 
-            print '%s, %s, %f' % (wid, rid, jargon_distance)
+    # Codebooks of all groups as the shared corpus prior plus sparse group
+    # distributions; blocks of writer groups are computed in parallel
+    # Rows and columns follow the sorted group IDs, which run from 1
+    gids, vocabulary, codebooks = sparse_codebooks(groups_freq)
+    print '%d groups, %d words' % (len(gids), len(vocabulary))
+    distance_matrix = jargon_distance_matrix(codebooks, processes)
 
     return distance_matrix
 
 
+def stream_group_counts(groups_file, abstracts_file, stopwords):
+    '''Counts the words of each group's abstracts, one abstract at a time
+    Takes the paths of the tab separated pID to group file and pID to
+    abstract file (both with a heading line), and the stop words (list or
+    StopwordFilter)
+    Returns dict where key is group ID and value is the group's word
+    frequencies (list of (word, count) tuples)'''
+
+    group_assignments = {}
+    with open(groups_file, 'r') as f:
+        next(f) # skip headings
+        reader = csv.reader(f, delimiter='\t')
+        for pid, gid in reader:
+            group_assignments[pid] = int(gid)
+
+    # Only the counts are kept, never the text of a whole group
+    stop_filter = stop_list_filter(stopwords)
+    groups_counts = defaultdict(Counter)
+    with open(abstracts_file, 'r') as f:
+        next(f) # skip headings
+        reader = csv.reader(f, delimiter='\t')
+        for pid, text in reader:
+            gid = group_assignments.get(pid)
+            if gid is not None and text != 'null':
+                groups_counts[gid].update(stop_filter.filter(text))
+
+    return { gid: counts.items() for gid, counts in groups_counts.iteritems() }
+
+
 def symmetrize(matrix):
     '''Makes a matrix symmetrical by averaging the diagonal differences: 
     a particular row to column value becomes equal to column to row value
@@ -77,29 +107,23 @@ def stop_and_stem(document):
     Takes a document (string)
     Returns words (list of strings)'''
     
-    tokenizer = RegexpTokenizer(r'[a-z]+') # remove punctuation
-    document = document.lower()
-    document = tokenizer.tokenize(document)
-    
-    stop = stopwords.words('english')
-    words = [word for word in document if word not in stop]
-    
-    stemmer = PorterStemmer()
-    words = [stemmer.stem(word) for word in words]
-    
-    words = [x.encode('UTF8') for x in words] # use ASCII
-    
-    return words
+    return normalizer.normalize(document) # shared setup, single pass
+
+
+def stop_list_filter(stoplist):
+    '''Takes a list of stopwords (list of strings) or a StopwordFilter
+    Returns a StopwordFilter, so the stop word set is built only once'''
+    if isinstance(stoplist, StopwordFilter):
+        return stoplist
+    return StopwordFilter(stoplist)
 
 
 def stop_custom_list(document, stoplist):
     '''Removes stop words from list
-    Takes a document (string) and list of stopwords (list of strings)
+    Takes a document (string) and list of stopwords (list of strings) or StopwordFilter
     Returns words (list of strings)'''
     
-    document = document.split(' ')
-    words = [word for word in document if word not in stoplist]
-    return words
+    return stop_list_filter(stoplist).filter(document) # hashed lookups, whitespace runs
 
 
 def get_TDM(documents):
@@ -218,16 +242,18 @@ def get_jargon_distance(writer_codebook, reader_codebook):
     return cultural_hole
 
     
-def LDA_on_patent_data():
-    '''Fetches patent documents from server and performs LDA using unigrams'''
+def LDA_on_patent_data(offline=False):
+    '''Fetches patent documents from server and performs LDA using unigrams
+    Documents come from the local cache shared with assignment2 when possible'''
     
     url = 'https://s3-us-west-2.amazonaws.com/uspto-patentsclaims/'
     ids = range(6334220, 6334230) # Document IDs to fetch
     ids = [str(doc_id) for doc_id in ids]
 
-    documents = {}
-    for doc_id in ids:
-        documents[doc_id] = requests.get(url + doc_id + '.txt').content
+    cache = DocumentCache(offline=offline)
+    fetcher = PatentFetcher(url, cache=cache)
+    documents = dict(fetcher.fetch(ids))
+    cache.save()
     
     all_unigrams = []
     for document in documents.itervalues():
@@ -316,43 +342,10 @@ def jargon_distance_cats_hipsters():
 
 
 def jargon_distance_abstracts():
-    stopwords = ['all','just','being','over','both','through','yourselves','its',
-                 'before','herself','had','should','to','only','under','ours','has',
-                 'do','them','his','very','they','not','during','now','him','nor',
-                 'did','this','she','each','further','where','few','because','doing',
-                 'some','are','our','ourselves','out','what','for','while','does','above',
-                 'between','t','be','we','who','were','here','hers','by','on','about','of',
-                 'against','s','or','own','into','yourself','down','your','from','her',
-                 'their','there','been','whom','too','themselves','was','until','more',
-                 'himself','that','but','don','with','than','those','he','me','myself',
-                 'these','up','will','below','can','theirs','my','and','then','is','am',
-                 'it','an','as','itself','at','have','in','any','if','again','no','when',
-                 'same','how','other','which','you','after','most','such','why','a','off',
-                 'i','yours','so','the','having','once']
-
-    groups = {}
-    group_assignments = {}
+    stopwords = StopwordFilter(load_stopwords('stopwords.txt'))
 
-    with open('groups2.txt','r') as f:
-        next(f) # skip headings
-        reader=csv.reader(f, delimiter='\t')
-        for pid, gid in reader:
-            group_assignments[pid] = int(gid)
-
-    with open('abstracts2.txt','r') as f:
-        next(f) # skip headings
-        reader=csv.reader(f, delimiter='\t')
-        for pid, text in reader:
-            gid = group_assignments[pid]
-            if text != 'null':
-                try:
-                    # append the new number to the existing array at this slot
-                    groups[gid].append(text)
-                except KeyError:
-                    # create a new array in this slot
-                    groups[gid] = [text]
-
-    distances = jargon_distance_among_groups(groups, stopwords)
+    groups_freq = stream_group_counts('groups2.txt', 'abstracts2.txt', stopwords)
+    distances = jargon_distance_from_counts(groups_freq)
     distances_symmetrized = symmetrize(distances)
     distances_clustered = cluster.hierarchy.average(distances_symmetrized)
     
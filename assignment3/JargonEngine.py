@@ -0,0 +1,172 @@
+import sys
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+from scipy import sparse
+
+'''
+Vectorized jargon distance among many groups at once.
+
+Instead of one dict codebook per group and a Python loop per writer/reader
+pair, the codebooks of all groups are treated as rows of one G x V matrix P
+(groups by vocabulary words), and the cross entropy of every writer/reader
+pair is a single matrix product:
+    cross_entropy[w, r] = -sum_v P[w, v] * log2(P[r, v])
+The Shannon entropy of each group is the diagonal of that matrix, so the
+whole jargon distance matrix is 1 - H[w] / cross_entropy[w, r].
+
+With large vocabularies the dense matrix doesn't fit in memory, but it
+doesn't need to: every codebook is alpha times the shared corpus
+distribution c, plus (1 - alpha) times the group's own sparse distribution
+G. Writing log2 of a codebook as the shared L0 = log2(alpha * c) plus a
+correction D that is non-zero only on the group's own words, the cross
+entropy splits into
+    -(alpha * c.L0 + (1 - alpha) * G.L0[w] + alpha * D.c[r] + (1 - alpha) * G.D^T[w, r])
+SparseCodebooks computes exactly that from sparse G and D, so memory grows
+with the words each group uses rather than groups times the vocabulary.
+
+For thousands of groups the writer x reader matrix is computed in blocks
+of writer rows spread over a process pool. The codebooks are handed to the
+workers by fork rather than pickled with every task: they are put in a
+module global before the pool starts, and each task only names its rows.
+'''
+
+# Codebooks shared with the pool workers, inherited when they are forked
+_shared_codebooks = None
+
+
+def group_count_matrix(groups_freq):
+    '''Collects the word counts of all groups in one sparse matrix
+    Takes dict where key is group ID and value is the group's word
+    frequencies (list of (word, count) tuples)
+    Returns a tuple of the sorted group IDs, the vocabulary (list of words)
+    and the counts (sparse CSR matrix, one row per group)'''
+
+    gids = sorted(groups_freq)
+    word_index = {}
+    rows, columns, counts = [], [], []
+    for row, gid in enumerate(gids):
+        for word, count in groups_freq[gid]:
+            column = word_index.get(word)
+            if column is None:
+                column = word_index[word] = len(word_index)
+            rows.append(row)
+            columns.append(column)
+            counts.append(count)
+
+    vocabulary = [None] * len(word_index)
+    for word, column in word_index.iteritems():
+        vocabulary[column] = word
+
+    # Duplicate (row, column) entries are summed
+    group_counts = sparse.coo_matrix((np.array(counts, dtype=float), (rows, columns)),
+                                     shape=(len(gids), len(vocabulary))).tocsr()
+    return gids, vocabulary, group_counts
+
+
+class SparseCodebooks(object):
+    '''Codebooks of all groups stored as the shared corpus prior plus each
+    group's sparse distribution
+    Takes the group word counts (sparse matrix, one row per group) and the
+    alpha fudge factor'''
+
+    def __init__(self, group_counts, alpha=0.01):
+        self.alpha = alpha
+        group_counts = sparse.csr_matrix(group_counts, dtype=float)
+
+        # Shared prior: corpus distribution c and L0 = log2(alpha * c)
+        corpus_counts = np.asarray(group_counts.sum(axis=0)).ravel()
+        self.corpus_prob = corpus_counts / corpus_counts.sum()
+        self.base_log = np.log2(alpha * self.corpus_prob)
+
+        # Group distributions G, normalized row by row
+        row_totals = np.asarray(group_counts.sum(axis=1)).ravel()
+        self.group_prob = sparse.diags(1 / row_totals).dot(group_counts).tocsr()
+
+        # Correction D = log2(codebook) - L0 on each group's own words:
+        # log2(1 + (1 - alpha) * G / (alpha * c))
+        G = self.group_prob.tocoo()
+        ratio = (1 - alpha) * G.data / (alpha * self.corpus_prob[G.col])
+        self.log_correction = sparse.csr_matrix((np.log1p(ratio) / np.log(2), (G.row, G.col)),
+                                                shape=G.shape)
+
+        self.shared_term = alpha * np.dot(self.corpus_prob, self.base_log)
+        self.writer_term = (1 - alpha) * self.group_prob.dot(self.base_log)
+        self.reader_term = alpha * self.log_correction.dot(self.corpus_prob)
+
+    def __len__(self):
+        return self.group_prob.shape[0]
+
+    def cross_entropy(self, writers=None):
+        '''Computes the cross entropy of writer groups to every reader group
+        Takes the writer row indices (all groups by default)
+        Returns ndarray where row is writer group and column is reader group'''
+        if writers is None:
+            writers = np.arange(len(self))
+        pairs = self.group_prob[writers].dot(self.log_correction.T).toarray()
+        return -(self.shared_term
+                 + self.writer_term[writers][:, np.newaxis]
+                 + self.reader_term[np.newaxis, :]
+                 + (1 - self.alpha) * pairs)
+
+
+def sparse_codebooks(groups_freq, alpha=0.01):
+    '''Builds the codebooks of all groups in sparse form
+    Takes dict where key is group ID and value is the group's word
+    frequencies (list of (word, count) tuples), and the alpha fudge factor
+    Returns a tuple of the sorted group IDs, the vocabulary (list of words)
+    and the SparseCodebooks'''
+    gids, vocabulary, group_counts = group_count_matrix(groups_freq)
+    return gids, vocabulary, SparseCodebooks(group_counts, alpha)
+
+
+def _cross_entropy_block(rows):
+    '''Computes the cross entropy of a block of writer rows to all readers
+    Takes a (start, stop) tuple of writer row indices
+    Returns a tuple of the start row and the block (ndarray)'''
+    start, stop = rows
+    return start, _shared_codebooks.cross_entropy(np.arange(start, stop))
+
+
+def cross_entropy_matrix(codebooks, processes=1, block_size=256):
+    '''Computes the cross entropy of every pair of codebooks
+    Takes the SparseCodebooks, the number of worker processes (all cores if
+    None) and the number of writer rows per task
+    Returns ndarray where row is writer group and column is reader group'''
+    global _shared_codebooks
+
+    group_count = len(codebooks)
+    blocks = [(start, min(start + block_size, group_count)) for start in range(0, group_count, block_size)]
+    processes = processes or cpu_count()
+
+    _shared_codebooks = codebooks
+    try:
+        if processes == 1 or len(blocks) == 1:
+            return np.vstack([_cross_entropy_block(rows)[1] for rows in blocks])
+
+        cross_entropy = np.empty((group_count, group_count))
+        pool = Pool(min(processes, len(blocks)))
+        try:
+            done = 0
+            for start, block in pool.imap_unordered(_cross_entropy_block, blocks):
+                cross_entropy[start:start + len(block)] = block
+                done += len(block)
+                sys.stdout.write('\rCross entropy: %d of %d writer groups' % (done, group_count))
+                sys.stdout.flush()
+            print
+        finally:
+            pool.terminate()
+        return cross_entropy
+    finally:
+        _shared_codebooks = None
+
+
+def jargon_distance_matrix(codebooks, processes=1, block_size=256):
+    '''Computes the jargon distance of every writer to reader pair
+    Takes the SparseCodebooks, the number of worker processes (all cores if
+    None) and the number of writer rows per task
+    Returns ndarray of jargon distances where row is writer group and
+    column is reader group'''
+    cross_entropy = cross_entropy_matrix(codebooks, processes, block_size)
+    shannon = np.diag(cross_entropy)
+    return 1 - shannon[:, np.newaxis] / cross_entropy
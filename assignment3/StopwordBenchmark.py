@@ -0,0 +1,58 @@
+import csv
+import time
+from StopwordFilter import StopwordFilter, load_stopwords
+
+'''
+Benchmark of stop word filtering at groups2.txt scale: one abstract per
+paper in groups2.txt, with the text taken in turn from abstracts.txt.
+Prints tokens per second for
+    before = split on single spaces, each word checked against the list
+    after  = StopwordFilter, per abstract and in one batch per group
+'''
+
+
+def stop_custom_list_before(document, stoplist):
+    # The original stop_custom_list()
+    document = document.split(' ')
+    words = [word for word in document if word not in stoplist]
+    return words
+
+
+def main():
+    stopwords = load_stopwords('stopwords.txt')
+    stop_filter = StopwordFilter(stopwords)
+
+    with open('abstracts.txt', 'r') as f:
+        texts = [text for pid, text in csv.reader(f, delimiter='\t') if text != 'null']
+
+    groups = {}
+    with open('groups2.txt', 'r') as f:
+        next(f) # skip headings
+        for i, (pid, gid) in enumerate(csv.reader(f, delimiter='\t')):
+            groups.setdefault(int(gid), []).append(texts[i % len(texts)])
+
+    abstracts = [text for documents in groups.itervalues() for text in documents]
+    tokens = sum(len(text.split()) for text in abstracts)
+    print '%d abstracts in %d groups, %d tokens' % (len(abstracts), len(groups), tokens)
+
+    start = time.time()
+    for text in abstracts:
+        stop_custom_list_before(text, stopwords)
+    report('before (list)', tokens, time.time() - start)
+
+    start = time.time()
+    for text in abstracts:
+        stop_filter.filter(text)
+    report('after (per abstract)', tokens, time.time() - start)
+
+    start = time.time()
+    for documents in groups.itervalues():
+        stop_filter.filter_group(documents)
+    report('after (per group)', tokens, time.time() - start)
+
+
+def report(name, tokens, seconds):
+    print '%-22s %8.3f s %12.0f tokens/s' % (name, seconds, tokens / seconds)
+
+
+main()
@@ -0,0 +1,37 @@
+import re
+
+'''
+Stop word filtering for text that is already lower case and free of
+punctuation, such as the abstracts in abstracts.txt. Documents are only
+split on whitespace, and each word is checked against a hashed set instead
+of scanning a list, so none of the tokenizing and stemming of assignment2's
+text normalizer is set up.
+'''
+
+
+class StopwordFilter(object):
+    '''Splits documents on runs of whitespace and removes stop words
+    Takes the stop words (any iterable of strings)'''
+
+    def __init__(self, stop):
+        self.stop = frozenset(stop)
+
+    def filter(self, document):
+        '''Takes a document (string)
+        Returns words (list of strings)'''
+        stop = self.stop
+        return [word for word in document.split() if word not in stop]
+
+    def filter_group(self, documents):
+        '''Takes the documents of a group (iterable of strings)
+        Returns the words of all documents (one list of strings)'''
+        stop = self.stop
+        return [word for document in documents for word in document.split() if word not in stop]
+
+
+def load_stopwords(path):
+    '''Reads the stop words quoted in a file, e.g. stopwords = ["all", "just", ...]
+    Takes the file path
+    Returns stop words (list of strings)'''
+    with open(path, 'r') as stop_file:
+        return re.findall(r'"([^"]+)"', stop_file.read())